@@ -57,7 +57,8 @@ export const uploadDocument = async (
           file_name: fileName,
         },
       });
-      newDocument["chunked_ids"] = response.ids;
+      // Chunks are stored in the background and deleted by document_id
+      newDocument["ingestion_job_id"] = response.job_id;
     }
 
     // Get current hotspot
@@ -158,8 +159,8 @@ export const deleteDocument = async (documentId: string): Promise<void> => {
     }
 
     // Remove the document from the array
-    let chunked_ids = hotspot.documents[documentIndex].chunked_ids;
-    await deleteChatDocument(chunked_ids || []);
+    const document = hotspot.documents[documentIndex];
+    await deleteChatDocument(document.chunked_ids || [], [document.id]);
     const updatedDocuments = hotspot.documents.filter(
       (_, index) => index !== documentIndex
     );
@@ -192,6 +193,14 @@ export const bulkDeleteDocuments = async (
         const sortedIndices = indices.sort((a, b) => b - a);
         let updatedDocuments = [...hotspot.documents];
 
+        const removed = sortedIndices
+          .map((index) => updatedDocuments[index])
+          .filter(Boolean);
+        await deleteChatDocument(
+          removed.flatMap((document) => document.chunked_ids || []),
+          removed.map((document) => document.id)
+        );
+
         sortedIndices.forEach((index) => {
           updatedDocuments.splice(index, 1);
         });
@@ -248,9 +257,12 @@ export const addChatFileDocument = async (
   return data.data;
 };
 
-export const deleteChatDocument = async (ids: string[]) => {
+export const deleteChatDocument = async (
+  ids: string[],
+  documentIds: string[] = []
+) => {
   let data = await getApi().delete(`/documents/delete`, {
-    data: { ids },
+    data: { ids, document_ids: documentIds },
   });
   if (data.status !== 200) {
     throw new Error("Failed to delete chat document: " + data.statusText);
@@ -243,9 +243,11 @@ export const updateHotspot = async (
 export const deleteHotspot = async (hotspot_id: string): Promise<void> => {
   try {
     let hotspot = await getHotspotById(hotspot_id);
-    let ids = hotspot?.metadata?.ids;
-    if (ids) {
-      await deleteChatDocument(ids);
+    let ids = hotspot?.metadata?.ids || [];
+    // Chunks of the hotspot's uploaded files go with it
+    let documentIds = (hotspot?.documents || []).map((document) => document.id);
+    if (ids.length || documentIds.length) {
+      await deleteChatDocument(ids, documentIds);
     }
   } catch (error) {
     console.log("Failed to get hotspot: " + (error as Error).message);
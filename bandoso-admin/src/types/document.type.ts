@@ -9,6 +9,7 @@ export interface Document {
   created_at?: string;
   updated_at?: string;
   chunked_ids?: string[];
+  ingestion_job_id?: string;
 }
 
 export interface DocumentUpload {
@@ -0,0 +1,105 @@
+"""
+Tag existing chunks with the area_id tenant key
+
+Chunks ingested before area-scoped retrieval have no ``metadata.area_id`` and
+are invisible to area-filtered searches. This resolves each chunk's area from
+its hotspot and writes it into the payload.
+
+With --drop-global-graph, once no chunk is left without an area, the chunk
+collection's HNSW m is set to 0 so only the per-area graphs are built. Only
+do this when searches are nearly always scoped to a single area: searches
+without an area, or across an area and the shared one, then scan instead.
+
+Usage:
+    python -m app.cli.backfill_area_ids [--all] [--batch-size 256] [--dry-run] [--drop-global-graph]
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+
+from qdrant_client import models
+
+from app.config import config
+from app.db.qdrant import get_async_client
+from app.services.area import resolve_document_area_id
+
+
+UNTAGGED = models.Filter(must=[
+    models.IsEmptyCondition(is_empty=models.PayloadField(key="metadata.area_id"))
+])
+
+
+async def drop_global_graph() -> None:
+    async_client = get_async_client()
+    collection_name = config.CHUNK_COLLECTION_NAME
+    untagged = (await async_client.count(collection_name, count_filter=UNTAGGED, exact=True)).count
+    if untagged:
+        raise SystemExit(f"Keeping the global HNSW graph: {untagged} chunks still have no area_id")
+    await async_client.update_collection(collection_name, hnsw_config=models.HnswConfigDiff(m=0))
+    print(f"Dropped the global HNSW graph of {collection_name} (m=0); set CHUNK_HNSW_M=0 to keep it that way")
+
+
+async def backfill(batch_size: int, include_tagged: bool, dry_run: bool) -> None:
+    async_client = get_async_client()
+    collection_name = config.CHUNK_COLLECTION_NAME
+    scroll_filter = None if include_tagged else UNTAGGED
+    offset = None
+    scanned = tagged = skipped = 0
+
+    while True:
+        records, offset = await async_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["metadata"],
+            with_vectors=False,
+        )
+        by_area = defaultdict(list)
+        for record in records:
+            metadata = dict((record.payload or {}).get("metadata") or {})
+            if include_tagged:
+                metadata.pop("area_id", None)
+            area_id = await resolve_document_area_id(metadata)
+            if area_id is None:
+                skipped += 1
+                continue
+            by_area[area_id].append(record.id)
+
+        for area_id, point_ids in by_area.items():
+            if not dry_run:
+                await async_client.set_payload(
+                    collection_name=collection_name,
+                    payload={"area_id": area_id},
+                    points=point_ids,
+                    key="metadata",
+                )
+            tagged += len(point_ids)
+
+        scanned += len(records)
+        print(f"Scanned {scanned} chunks, tagged {tagged}, skipped {skipped}")
+        if offset is None:
+            break
+
+    print(f"Done{' (dry run)' if dry_run else ''}: {tagged} chunks tagged, {skipped} without a known area")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Recompute area_id for chunks that already have one")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--drop-global-graph", action="store_true",
+                        help="Set HNSW m=0 on the chunk collection once every chunk has an area")
+    args = parser.parse_args()
+
+    async def run():
+        await backfill(args.batch_size, args.all, args.dry_run)
+        if args.drop_global_graph and not args.dry_run:
+            await drop_global_graph()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
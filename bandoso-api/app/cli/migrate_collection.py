@@ -0,0 +1,219 @@
+"""
+Rebuild a Qdrant collection under its current config profile
+
+Creates a new physical collection with the profile from app.db.profiles
+(quantization, on-disk storage, HNSW), recreates its payload indexes, copies
+every point, then points the configured name at it with an atomic alias swap,
+so searches never see a missing or half-filled collection. Points added,
+changed or deleted in the source while the copy and indexing ran are caught
+up right before the swap, and those written during the swap right after it.
+
+The first migration of a collection is special: the configured name is still
+a real collection, and an alias cannot take its name until it is deleted, so
+that run needs --replace-collection and has a short gap between the delete
+and the alias creation, during which writes fail. Pause ingestion for it.
+Later migrations swap atomically and keep the previous collection unless
+--delete-old is given.
+
+Usage:
+    python -m app.cli.migrate_collection chunks [--batch-size 256] [--delete-old] [--replace-collection]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+from qdrant_client import models
+
+from app.db.qdrant import get_async_client
+from app.db.indexes import PAYLOAD_INDEXES
+from app.db.profiles import PROFILE_PREFIXES, collection_profile
+
+
+async def _resolve(name: str) -> tuple[str, bool]:
+    """Return the physical collection behind a name, and whether the name is an alias."""
+    async_client = get_async_client()
+    aliases = (await async_client.get_aliases()).aliases
+    for alias in aliases:
+        if alias.alias_name == name:
+            return alias.collection_name, True
+    return name, False
+
+
+async def _copy(source: str, target: str, batch_size: int) -> int:
+    async_client = get_async_client()
+    copied = 0
+    offset = None
+    while True:
+        records, offset = await async_client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = [
+            models.PointStruct(id=record.id, vector=record.vector, payload=record.payload)
+            for record in records
+        ]
+        if points:
+            await async_client.upsert(collection_name=target, points=points, wait=True)
+        copied += len(points)
+        if offset is None:
+            return copied
+        print(f"  copied {copied} points")
+
+
+def _digest(payload) -> str:
+    # Vectors are derived from page_content, so a changed point always has a changed payload
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def _snapshot(collection_name: str, batch_size: int) -> dict:
+    """Digest of every point's payload, by id."""
+    async_client = get_async_client()
+    digests, offset = {}, None
+    while True:
+        records, offset = await async_client.scroll(
+            collection_name=collection_name,
+            limit=batch_size * 8,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for record in records:
+            digests[record.id] = _digest(record.payload)
+        if offset is None:
+            return digests
+
+
+async def _apply(source: str, target: str, changed: list, deleted: list, batch_size: int) -> None:
+    async_client = get_async_client()
+    for start in range(0, len(changed), batch_size):
+        records = await async_client.retrieve(
+            source, ids=changed[start:start + batch_size], with_payload=True, with_vectors=True
+        )
+        if records:
+            await async_client.upsert(
+                collection_name=target,
+                points=[models.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+                wait=True,
+            )
+    for start in range(0, len(deleted), batch_size):
+        await async_client.delete(
+            target, points_selector=models.PointIdsList(points=deleted[start:start + batch_size]), wait=True
+        )
+
+
+async def _catch_up(source: str, target: str, batch_size: int, max_passes: int = 5) -> dict:
+    """
+    Copy the points added, changed or deleted in the source since the copy
+
+    Repeats until a pass finds nothing to do, so the last pass is short and
+    runs right before the swap.
+
+    Returns:
+        dict: The source snapshot the target was last made to match
+    """
+    for _ in range(max_passes):
+        source_digests = await _snapshot(source, batch_size)
+        target_digests = await _snapshot(target, batch_size)
+        changed = [point_id for point_id, digest in source_digests.items() if target_digests.get(point_id) != digest]
+        deleted = [point_id for point_id in target_digests if point_id not in source_digests]
+        if not changed and not deleted:
+            break
+        print(f"Catching up {len(changed)} added or changed and {len(deleted)} deleted points")
+        await _apply(source, target, changed, deleted, batch_size)
+    return source_digests
+
+
+async def _replay_after_swap(source: str, target: str, baseline: dict, batch_size: int) -> None:
+    """Apply to the target what writers still sent to the source between the last catch-up and the swap."""
+    source_digests = await _snapshot(source, batch_size)
+    changed = [point_id for point_id, digest in source_digests.items() if baseline.get(point_id) != digest]
+    deleted = [point_id for point_id in baseline if point_id not in source_digests]
+    if changed or deleted:
+        print(f"Replaying {len(changed)} added or changed and {len(deleted)} deleted points written during the swap")
+        await _apply(source, target, changed, deleted, batch_size)
+
+
+async def _wait_green(collection_name: str, timeout: float = 3600) -> None:
+    async_client = get_async_client()
+    deadline = time.monotonic() + timeout
+    while (await async_client.get_collection(collection_name)).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{collection_name} is still optimizing")
+        await asyncio.sleep(2)
+
+
+async def migrate(name: str, batch_size: int, delete_old: bool, replace_collection: bool) -> None:
+    if name not in PROFILE_PREFIXES:
+        raise SystemExit(f"No profile for collection {name}; expected one of {', '.join(PROFILE_PREFIXES)}")
+
+    async_client = get_async_client()
+    source, is_alias = await _resolve(name)
+    if not is_alias and not replace_collection:
+        raise SystemExit(
+            f"{name} is a collection, not an alias yet. Qdrant cannot atomically replace a collection by an\n"
+            f"alias: {name} has to be deleted before the alias can take its name, so for a moment it does not\n"
+            "exist, and writes sent to it between the final catch-up and the delete are lost. Pause ingestion\n"
+            "and cache writes, then re-run with --replace-collection to copy the points and replace it.\n"
+            "Later migrations swap the alias atomically without this."
+        )
+
+    target = f"{name}_{time.strftime('%Y%m%d_%H%M%S')}"
+    while await async_client.collection_exists(target):
+        target += "_1"
+    print(f"Creating {target} for {name} (currently {source})")
+    await async_client.create_collection(collection_name=target, **collection_profile(name))
+    for field_name, schema in PAYLOAD_INDEXES.get(name, {}).items():
+        await async_client.create_payload_index(target, field_name, field_schema=schema)
+
+    print(f"Copying {source} -> {target}")
+    copied = await _copy(source, target, batch_size)
+    print(f"Copied {copied} points")
+
+    print("Waiting for indexing to finish")
+    await _wait_green(target)
+
+    # Writes made during the copy and the indexing wait
+    baseline = await _catch_up(source, target, batch_size)
+
+    source_count = (await async_client.count(source, exact=True)).count
+    target_count = (await async_client.count(target, exact=True)).count
+    print(f"{source}: {source_count} points, {target}: {target_count} points")
+
+    if is_alias:
+        await async_client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=name)),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=name)),
+        ])
+        print(f"{name} now points to {target}")
+        # Writers that resolved the alias just before the swap may still have written to the source
+        await _replay_after_swap(source, target, baseline, batch_size)
+        if delete_old:
+            await async_client.delete_collection(source)
+            print(f"Deleted {source}")
+    else:
+        print(f"Deleting collection {name}: it does not exist until the alias is created")
+        await async_client.delete_collection(source)
+        await async_client.update_collection_aliases(change_aliases_operations=[
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=name)),
+        ])
+        print(f"Replaced collection {name} by an alias to {target}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collection", help="Configured collection name, e.g. chunks or cache")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delete-old", action="store_true", help="Delete the previous collection after the swap")
+    parser.add_argument("--replace-collection", action="store_true",
+                        help="First migration only: delete the real collection so an alias can take its name")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.collection, args.batch_size, args.delete_old, args.replace_collection))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure how long the API takes to import and to boot
+
+Import time is measured in fresh interpreters, since a warm module cache hides
+the cost that a cold start (a new worker, a scaled-up container) pays. Boot
+time runs the app lifespan against the configured Qdrant, Supabase and
+checkpointer, and prints the time of each startup step.
+
+Usage:
+    python -m app.cli.startup_benchmark [--runs 5] [--top 10] [--no-boot] [--max-import-seconds 3]
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"import app.main failed:\n{result.stderr}")
+    return result
+
+
+def measure_import(runs: int) -> list[float]:
+    return [float(_run("-c", _IMPORT_SNIPPET).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+
+
+def slowest_imports(top: int) -> list[tuple[float, str]]:
+    """Cumulative import time of each package that the app's own modules import."""
+    stderr = _run("-X", "importtime", "-c", "import app.main").stderr
+    entries = []
+    for line in stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", children listed first and indented
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1e6))
+
+    packages: dict[str, float] = {}
+    parents: list[tuple[int, str]] = []
+    for depth, name, seconds in reversed(entries):
+        while parents and parents[-1][0] >= depth:
+            parents.pop()
+        package = name.split(".")[0]
+        # Only count a package where the app imports it, not again inside another library
+        if package != "app" and parents and all(parent == "app" for _, parent in parents):
+            packages[package] = packages.get(package, 0) + seconds
+        parents.append((depth, package))
+    return sorted(((seconds, package) for package, seconds in packages.items()), reverse=True)[:top]
+
+
+async def measure_boot() -> tuple[float, dict]:
+    from app.main import app
+    from app.services.health import startup
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        boot_seconds = time.perf_counter() - started
+    return boot_seconds, startup["steps"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time the import in")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imported packages to list, 0 to skip")
+    parser.add_argument("--no-boot", action="store_true", help="Only measure the import")
+    parser.add_argument("--max-import-seconds", type=float, help="Exit with 1 when the median import is slower")
+    args = parser.parse_args()
+
+    timings = measure_import(args.runs)
+    median = statistics.median(timings)
+    print(f"import app.main: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s ({args.runs} runs)")
+
+    if args.top:
+        print("Slowest packages:")
+        for seconds, package in slowest_imports(args.top):
+            print(f"  {seconds:7.3f}s  {package}")
+
+    if not args.no_boot:
+        boot_seconds, steps = asyncio.run(measure_boot())
+        print(f"lifespan startup: {boot_seconds:.3f}s")
+        for name, step in steps.items():
+            print(f"  {step['seconds']:7.3f}s  {name}{' FAILED: ' + step['error'] if step['error'] else ''}")
+
+    if args.max_import_seconds is not None and median > args.max_import_seconds:
+        print(f"Median import time {median:.3f}s is over {args.max_import_seconds}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
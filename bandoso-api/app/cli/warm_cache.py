@@ -0,0 +1,88 @@
+"""
+Fill the semantic cache before traffic does
+
+import loads curated Q&A pairs from a CSV file (header with question, answer
+and optionally area_id; other columns become metadata) or a JSONL file with
+the same keys. replay answers the most asked questions through the full
+pipeline. The API counts every question asked in the question log
+(QUESTION_LOG_DB_PATH), so point it at the same file; questions asked before
+the log existed are not counted. The hit rate over the asks of the replayed
+questions is printed before and after.
+
+Usage:
+    python -m app.cli.warm_cache import faq.csv [--area-id hue] [--format csv] [--batch-size 64]
+    python -m app.cli.warm_cache replay [--top 100] [--area-id hue] [--concurrency 4]
+"""
+import argparse
+import asyncio
+
+from app.config import config
+from app.core.checkpointer import checkpointer
+from app.services.cache_warmup import FAQ_FORMATS, import_faq, new_progress, parse_faq, replay_questions
+
+
+async def _report(progress: dict, interval: float = 2.0) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        print(f"  {progress['done']}/{progress['total']} done, {progress['inserted']} cached, {progress['failed']} failed")
+
+
+async def _run(job, progress: dict) -> None:
+    reporter = asyncio.create_task(_report(progress))
+    try:
+        await job
+    finally:
+        reporter.cancel()
+    print(
+        f"Done: {progress['total']} questions, {progress['inserted']} cached, "
+        f"{progress['deduplicated']} merged into existing entries, {progress['skipped']} skipped, "
+        f"{progress['failed']} failed"
+    )
+    if progress["hit_rate_before"] is not None:
+        print(f"Hit rate over the replayed questions: {progress['hit_rate_before']:.1%} -> {progress['hit_rate_after']:.1%}")
+
+
+async def run_import(path: str, format: str, area_id: str, batch_size: int) -> None:
+    with open(path, encoding="utf-8-sig") as f:
+        pairs = parse_faq(f.read(), format)
+    print(f"Importing {len(pairs)} Q&A pairs from {path}")
+    progress = new_progress("import")
+    await _run(import_faq(pairs, progress, area_id, batch_size), progress)
+
+
+async def run_replay(top_n: int, area_id: str, concurrency: int) -> None:
+    await checkpointer.start()
+    try:
+        progress = new_progress("replay")
+        await _run(replay_questions(top_n, progress, area_id, concurrency), progress)
+    finally:
+        await checkpointer.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    faq = commands.add_parser("import", help="Load curated Q&A pairs")
+    faq.add_argument("path")
+    faq.add_argument("--format", choices=FAQ_FORMATS, help="Defaults to the file extension")
+    faq.add_argument("--area-id", help="Area of the rows without an area_id")
+    faq.add_argument("--batch-size", type=int, default=config.QUERY_CACHE_WARMUP_BATCH_SIZE)
+
+    replay = commands.add_parser("replay", help="Answer the most asked questions counted by the question log")
+    replay.add_argument("--top", type=int, default=100)
+    replay.add_argument("--area-id", help="Only replay this area's questions")
+    replay.add_argument("--concurrency", type=int, default=config.QUERY_CACHE_WARMUP_CONCURRENCY)
+
+    args = parser.parse_args()
+    if args.command == "import":
+        format = args.format or args.path.rsplit(".", 1)[-1].lower()
+        if format not in FAQ_FORMATS:
+            parser.error(f"Cannot tell the format of {args.path}; pass --format")
+        asyncio.run(run_import(args.path, format, args.area_id, args.batch_size))
+    else:
+        asyncio.run(run_replay(args.top, args.area_id, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,6 +7,12 @@ load_dotenv(".env", override=True)
 class Configs:
     QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT = os.getenv("QDRANT_PORT", "6333")
+    QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+    QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+    QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", 4))
+    QDRANT_TIMEOUT_SECONDS = int(os.getenv("QDRANT_TIMEOUT_SECONDS", 10))
+    QDRANT_RETRIES = int(os.getenv("QDRANT_RETRIES", 3))
+    QDRANT_RETRY_BACKOFF_SECONDS = float(os.getenv("QDRANT_RETRY_BACKOFF_SECONDS", 0.2))
     SUPABASE_HOST = os.getenv("SUPABASE_HOST", "")
     SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
     GOOGLE_AI_API_KEY = os.getenv("GOOGLE_AI_API_KEY", "")
@@ -19,6 +26,101 @@ class Configs:
     LIMIT_REACH_MESSAGE = os.getenv("LIMIT_REACH_MESSAGE")
     EMBEDDING_SIZE = os.getenv("EMBEDDING_SIZE", 1024)
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:5174").split(",")
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "jina-embeddings-v4")
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embeddings.sqlite3"))
+    EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", 5000))
+    INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 1000))
+    INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", 200))
+    INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 64))
+    INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+    INGEST_JOB_DB_PATH = os.getenv("INGEST_JOB_DB_PATH", os.path.join(DATA_DIR, "ingestion_jobs.sqlite3"))
+    # A running job whose process has not renewed its lease for INGEST_JOB_LEASE_SECONDS is taken over
+    INGEST_JOB_HEARTBEAT_SECONDS = float(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", 10))
+    INGEST_JOB_LEASE_SECONDS = float(os.getenv("INGEST_JOB_LEASE_SECONDS", 60))
+    REQUEST_COUNT_DB_PATH = os.getenv("REQUEST_COUNT_DB_PATH", os.path.join(DATA_DIR, "request_counts.sqlite3"))
+    REQUEST_COUNT_FLUSH_INTERVAL_SECONDS = float(os.getenv("REQUEST_COUNT_FLUSH_INTERVAL_SECONDS", 5))
+    # Applied flush ids are kept this long in the database to ignore a replayed flush
+    REQUEST_COUNT_FLUSH_ID_RETENTION_SECONDS = float(os.getenv("REQUEST_COUNT_FLUSH_ID_RETENTION_SECONDS", 604800))
+    AREA_CACHE_MAX_SIZE = int(os.getenv("AREA_CACHE_MAX_SIZE", 10000))
+    AREA_CACHE_TTL_SECONDS = float(os.getenv("AREA_CACHE_TTL_SECONDS", 300))
+    AREA_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("AREA_CACHE_NEGATIVE_TTL_SECONDS", 60))
+    AREA_COUNT_TTL_SECONDS = float(os.getenv("AREA_COUNT_TTL_SECONDS", 30))
+    AUTH_ROLE_CACHE_MAX_SIZE = int(os.getenv("AUTH_ROLE_CACHE_MAX_SIZE", 1000))
+    AUTH_ROLE_CACHE_TTL_SECONDS = float(os.getenv("AUTH_ROLE_CACHE_TTL_SECONDS", 60))
+    AUTH_TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", 1000))
+    VISITOR_LOG_QUEUE_SIZE = int(os.getenv("VISITOR_LOG_QUEUE_SIZE", 10000))
+    VISITOR_LOG_BATCH_SIZE = int(os.getenv("VISITOR_LOG_BATCH_SIZE", 500))
+    VISITOR_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("VISITOR_LOG_FLUSH_INTERVAL_SECONDS", 2))
+    VISITOR_LOG_DEDUPE_MAX_SIZE = int(os.getenv("VISITOR_LOG_DEDUPE_MAX_SIZE", 100000))
+    VISITOR_LOG_DEDUPE_TTL_SECONDS = float(os.getenv("VISITOR_LOG_DEDUPE_TTL_SECONDS", 86400))
+    CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite")
+    CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(DATA_DIR, "checkpoints.sqlite3"))
+    CHECKPOINT_THREAD_TTL_SECONDS = float(os.getenv("CHECKPOINT_THREAD_TTL_SECONDS", 86400))
+    CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", 10000))
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", 300))
+    # Past either budget, turns older than the last CONVERSATION_KEEP_TURNS are folded into the summary
+    CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", 20))
+    CONVERSATION_MAX_TOKENS = int(os.getenv("CONVERSATION_MAX_TOKENS", 8000))
+    CONVERSATION_KEEP_TURNS = int(os.getenv("CONVERSATION_KEEP_TURNS", 2))
+    # The model decides unless a router is opted into; heuristic, embedding and small_llm skip that call when confident
+    ROUTER_MODE = os.getenv("ROUTER_MODE", "llm")
+    ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", 0.7))
+    ROUTER_EMBEDDING_THRESHOLD = float(os.getenv("ROUTER_EMBEDDING_THRESHOLD", 0.5))
+    SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+    SPECULATIVE_RETRIEVAL_MIN_SIMILARITY = float(os.getenv("SPECULATIVE_RETRIEVAL_MIN_SIMILARITY", 0.6))
+    CHUNK_PAYLOAD_INDEXES = os.getenv("CHUNK_PAYLOAD_INDEXES", "area_id:keyword:tenant,hotspot_id:keyword,document_id:keyword,file_name:keyword")
+    CACHE_PAYLOAD_INDEXES = os.getenv("CACHE_PAYLOAD_INDEXES", "area_id:keyword:tenant,last_hit_at:float")
+    # 0 drops the global graph; only applied to an existing collection by backfill_area_ids --drop-global-graph
+    CHUNK_HNSW_M = int(os.getenv("CHUNK_HNSW_M", 16))
+    CHUNK_HNSW_PAYLOAD_M = int(os.getenv("CHUNK_HNSW_PAYLOAD_M", 16))
+    CHUNK_HNSW_EF_CONSTRUCT = int(os.getenv("CHUNK_HNSW_EF_CONSTRUCT", 100))
+    CHUNK_SEARCH_EF = int(os.getenv("CHUNK_SEARCH_EF", 128))
+    CHUNK_QUANTIZATION = os.getenv("CHUNK_QUANTIZATION", "scalar")
+    CHUNK_QUANTIZATION_ALWAYS_RAM = os.getenv("CHUNK_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    CHUNK_OVERSAMPLING = float(os.getenv("CHUNK_OVERSAMPLING", 2.0))
+    CHUNK_RESCORE = os.getenv("CHUNK_RESCORE", "true").lower() == "true"
+    CHUNK_VECTORS_ON_DISK = os.getenv("CHUNK_VECTORS_ON_DISK", "true").lower() == "true"
+    CHUNK_PAYLOAD_ON_DISK = os.getenv("CHUNK_PAYLOAD_ON_DISK", "true").lower() == "true"
+    CACHE_HNSW_M = int(os.getenv("CACHE_HNSW_M", 16))
+    CACHE_HNSW_PAYLOAD_M = int(os.getenv("CACHE_HNSW_PAYLOAD_M", 16))
+    CACHE_HNSW_EF_CONSTRUCT = int(os.getenv("CACHE_HNSW_EF_CONSTRUCT", 100))
+    CACHE_SEARCH_EF = int(os.getenv("CACHE_SEARCH_EF", 64))
+    CACHE_QUANTIZATION = os.getenv("CACHE_QUANTIZATION", "scalar")
+    CACHE_QUANTIZATION_ALWAYS_RAM = os.getenv("CACHE_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    CACHE_OVERSAMPLING = float(os.getenv("CACHE_OVERSAMPLING", 2.0))
+    CACHE_RESCORE = os.getenv("CACHE_RESCORE", "true").lower() == "true"
+    CACHE_VECTORS_ON_DISK = os.getenv("CACHE_VECTORS_ON_DISK", "false").lower() == "true"
+    CACHE_PAYLOAD_ON_DISK = os.getenv("CACHE_PAYLOAD_ON_DISK", "false").lower() == "true"
+    SHARED_AREA_ID = os.getenv("SHARED_AREA_ID", "global")
+    INCLUDE_SHARED_DOCUMENTS = os.getenv("INCLUDE_SHARED_DOCUMENTS", "true").lower() == "true"
+    SIDE_EFFECT_QUEUE_SIZE = int(os.getenv("SIDE_EFFECT_QUEUE_SIZE", 1000))
+    SIDE_EFFECT_WORKERS = int(os.getenv("SIDE_EFFECT_WORKERS", 4))
+    SIDE_EFFECT_MAX_ATTEMPTS = int(os.getenv("SIDE_EFFECT_MAX_ATTEMPTS", 3))
+    SIDE_EFFECT_RETRY_BACKOFF_SECONDS = float(os.getenv("SIDE_EFFECT_RETRY_BACKOFF_SECONDS", 0.5))
+    SIDE_EFFECT_DRAIN_TIMEOUT_SECONDS = float(os.getenv("SIDE_EFFECT_DRAIN_TIMEOUT_SECONDS", 30))
+    CHAT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("CHAT_STREAM_HEARTBEAT_SECONDS", 15))
+    CHAT_STREAM_POLL_SECONDS = float(os.getenv("CHAT_STREAM_POLL_SECONDS", 1))
+    # Identical questions asked while one is being answered share its run
+    CHAT_STREAM_COALESCE = os.getenv("CHAT_STREAM_COALESCE", "true").lower() == "true"
+    HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", 2.0))
+    STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+    QUERY_CACHE_L1_MAX_SIZE = int(os.getenv("QUERY_CACHE_L1_MAX_SIZE", 10000))
+    QUERY_CACHE_L1_TTL_SECONDS = float(os.getenv("QUERY_CACHE_L1_TTL_SECONDS", 3600))
+    QUERY_CACHE_L2_THRESHOLD = float(os.getenv("QUERY_CACHE_L2_THRESHOLD", 0.98))
+    # {"<area_id>": 0.96, ...}: areas whose questions need a looser or stricter match
+    QUERY_CACHE_L2_AREA_THRESHOLDS = json.loads(os.getenv("QUERY_CACHE_L2_AREA_THRESHOLDS", "{}"))
+    QUERY_CACHE_L2_DEDUPE_THRESHOLD = float(os.getenv("QUERY_CACHE_L2_DEDUPE_THRESHOLD", 0.98))
+    QUERY_CACHE_WARMUP_BATCH_SIZE = int(os.getenv("QUERY_CACHE_WARMUP_BATCH_SIZE", 64))
+    QUERY_CACHE_WARMUP_CONCURRENCY = int(os.getenv("QUERY_CACHE_WARMUP_CONCURRENCY", 4))
+    QUERY_CACHE_WARMUP_MAX_JOBS = int(os.getenv("QUERY_CACHE_WARMUP_MAX_JOBS", 20))
+    # Every asked question is counted here; the warm-up replays the most asked ones
+    QUESTION_LOG_DB_PATH = os.getenv("QUESTION_LOG_DB_PATH", os.path.join(DATA_DIR, "questions.sqlite3"))
+    QUERY_CACHE_L2_TTL_SECONDS = float(os.getenv("QUERY_CACHE_L2_TTL_SECONDS", 30 * 86400))
+    QUERY_CACHE_L2_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_L2_MAX_ENTRIES", 50000))
+    QUERY_CACHE_L2_COMPACT_TARGET_RATIO = float(os.getenv("QUERY_CACHE_L2_COMPACT_TARGET_RATIO", 0.9))
+    QUERY_CACHE_L2_COMPACT_INTERVAL_SECONDS = float(os.getenv("QUERY_CACHE_L2_COMPACT_INTERVAL_SECONDS", 600))
     
     
 config = Configs()
\ No newline at end of file
@@ -0,0 +1,287 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.config import config
+
+MEMORY = "memory"
+SQLITE = "sqlite"
+
+
+class BoundedCheckpointer(BaseCheckpointSaver):
+    """
+    Checkpoint saver that forgets idle conversations
+
+    Wraps an ``InMemorySaver`` or an ``AsyncSqliteSaver`` and records when each
+    thread was last read or written. A background task deletes threads that
+    have been idle longer than ``ttl`` and, past ``max_threads``, the least
+    recently used ones. With the SQLite backend the access times live in the
+    same database, so history survives restarts and every worker sharing the
+    file prunes against the same clock.
+    """
+
+    def __init__(self, backend: str, db_path: str, ttl: float, max_threads: int, prune_interval: float):
+        super().__init__()
+        if backend not in (MEMORY, SQLITE):
+            raise ValueError(f"Unknown checkpointer backend: {backend}")
+        self.backend = backend
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.prune_interval = prune_interval
+        self._saver: Optional[BaseCheckpointSaver] = InMemorySaver() if backend == MEMORY else None
+        self._conn = None
+        # thread_id -> last access, least recently used first
+        self._access: OrderedDict[str, float] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"evicted_idle": 0, "evicted_lru": 0, "prunes": 0, "last_prune_seconds": None}
+
+    @property
+    def saver(self) -> BaseCheckpointSaver:
+        if self._saver is None:
+            raise RuntimeError("Checkpointer is not started")
+        return self._saver
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        if self.backend == SQLITE:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = await aiosqlite.connect(self.db_path)
+            self._saver = AsyncSqliteSaver(self._conn)
+            await self._saver.setup()
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_access (thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            await self._conn.commit()
+            async with self._conn.execute("SELECT thread_id, last_access FROM thread_access ORDER BY last_access") as cur:
+                async for thread_id, last_access in cur:
+                    self._access[thread_id] = last_access
+        self.serde = self.saver.serde
+        self._task = asyncio.create_task(self._prune_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._conn is not None:
+            await self._flush_access()
+            await self._conn.close()
+            self._conn = None
+            self._saver = None
+
+    async def check(self) -> None:
+        """Raise when the checkpointer cannot serve a conversation."""
+        self.saver
+        if self._task is None or self._task.done():
+            raise RuntimeError("Checkpoint pruning is not running")
+        if self._conn is not None:
+            await self._conn.execute("SELECT 1")
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                await self.prune()
+            except Exception as e:
+                print(f"Error pruning checkpoints: {e}")
+
+    # Access tracking
+
+    def _touch(self, config: RunnableConfig) -> None:
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if thread_id is None:
+            return
+        thread_id = str(thread_id)
+        self._access[thread_id] = time.time()
+        self._access.move_to_end(thread_id)
+        self._dirty.add(thread_id)
+
+    async def _stage_access(self, config: RunnableConfig) -> None:
+        # Left uncommitted: the saver's own commit of the checkpoint write commits it in the same transaction
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if self._conn is None or thread_id is None or str(thread_id) not in self._access:
+            return
+        thread_id = str(thread_id)
+        async with self.saver.lock:
+            await self._conn.execute(
+                "INSERT INTO thread_access (thread_id, last_access) VALUES (?, ?)"
+                " ON CONFLICT (thread_id) DO UPDATE SET last_access = max(last_access, excluded.last_access)",
+                (thread_id, self._access[thread_id]),
+            )
+        self._dirty.discard(thread_id)
+
+    def _run_on_loop(self, coro):
+        # Like the SQLite saver's own sync API: run the async version on its loop, from another thread
+        try:
+            if asyncio.get_running_loop() is self.saver.loop:
+                coro.close()
+                raise asyncio.InvalidStateError("Synchronous checkpointer calls must come from another thread")
+        except RuntimeError:
+            pass
+        return asyncio.run_coroutine_threadsafe(coro, self.saver.loop).result()
+
+    async def _flush_access(self) -> None:
+        if self._conn is None or not self._dirty:
+            return
+        rows = [(thread_id, self._access[thread_id]) for thread_id in self._dirty if thread_id in self._access]
+        self._dirty.clear()
+        async with self.saver.lock:
+            await self._conn.executemany(
+                "INSERT INTO thread_access (thread_id, last_access) VALUES (?, ?)"
+                " ON CONFLICT (thread_id) DO UPDATE SET last_access = max(last_access, excluded.last_access)",
+                rows,
+            )
+            await self._conn.commit()
+
+    async def _stale_threads(self) -> tuple[list[str], list[str]]:
+        cutoff = time.time() - self.ttl
+        if self._conn is None:
+            # Access order is also time order, so the idle threads are a prefix
+            idle = [thread_id for thread_id, last_access in self._access.items() if last_access < cutoff]
+            remaining = list(self._access)[len(idle):]
+            return idle, remaining[:max(len(remaining) - self.max_threads, 0)]
+
+        await self._flush_access()
+        async with self._conn.execute("SELECT thread_id FROM thread_access WHERE last_access < ?", (cutoff,)) as cur:
+            idle = [row[0] for row in await cur.fetchall()]
+        async with self._conn.execute(
+            "SELECT thread_id FROM thread_access WHERE last_access >= ? ORDER BY last_access"
+            " LIMIT max((SELECT count(*) FROM thread_access WHERE last_access >= ?) - ?, 0)",
+            (cutoff, cutoff, self.max_threads),
+        ) as cur:
+            overflow = [row[0] for row in await cur.fetchall()]
+        return idle, overflow
+
+    async def prune(self) -> None:
+        started = time.monotonic()
+        idle, overflow = await self._stale_threads()
+        for thread_id in idle + overflow:
+            await self.adelete_thread(thread_id)
+        self.stats["evicted_idle"] += len(idle)
+        self.stats["evicted_lru"] += len(overflow)
+        self.stats["prunes"] += 1
+        self.stats["last_prune_seconds"] = time.monotonic() - started
+
+    async def latest_states(self) -> AsyncIterator[tuple[str, dict]]:
+        """The state of every tracked thread's latest checkpoint, without marking the thread as used."""
+        for thread_id in list(self._access):
+            checkpoint = await self.saver.aget_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+            if checkpoint is not None:
+                yield thread_id, checkpoint.checkpoint["channel_values"]
+
+    def get_stats(self) -> dict:
+        if self.backend == MEMORY:
+            saver = self.saver
+            size_bytes = sum(
+                len(checkpoint[1]) + len(metadata[1])
+                for namespaces in saver.storage.values()
+                for checkpoints in namespaces.values()
+                for checkpoint, metadata, _ in checkpoints.values()
+            )
+            size_bytes += sum(len(value[1]) for value in saver.blobs.values())
+            size_bytes += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+        else:
+            size_bytes = sum(
+                os.path.getsize(path)
+                for path in (self.db_path, self.db_path + "-wal")
+                if os.path.exists(path)
+            )
+        return {
+            **self.stats,
+            "backend": self.backend,
+            "threads": len(self._access),
+            "max_threads": self.max_threads,
+            "ttl": self.ttl,
+            "size_bytes": size_bytes,
+        }
+
+    # BaseCheckpointSaver
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._touch(config)
+        return self.saver.get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        if self._conn is not None:
+            return self._run_on_loop(self.aput(config, checkpoint, metadata, new_versions))
+        self._touch(config)
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        if self._conn is not None:
+            return self._run_on_loop(self.adelete_thread(thread_id))
+        self._access.pop(str(thread_id), None)
+        self._dirty.discard(str(thread_id))
+        self.saver.delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._touch(config)
+        return await self.saver.aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.saver.alist(config, **kwargs):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        self._touch(config)
+        await self._stage_access(config)
+        result = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        if self._conn is None and len(self._access) > self.max_threads:
+            # In memory, enforce the cap right away instead of waiting for the next prune
+            thread_id, _ = self._access.popitem(last=False)
+            await self.saver.adelete_thread(thread_id)
+            self.stats["evicted_lru"] += 1
+        return result
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        thread_id = str(thread_id)
+        self._access.pop(thread_id, None)
+        self._dirty.discard(thread_id)
+        await self.saver.adelete_thread(thread_id)
+        if self._conn is not None:
+            async with self.saver.lock:
+                await self._conn.execute("DELETE FROM thread_access WHERE thread_id = ?", (thread_id,))
+                await self._conn.commit()
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+
+checkpointer = BoundedCheckpointer(
+    backend=config.CHECKPOINTER_BACKEND,
+    db_path=config.CHECKPOINT_DB_PATH,
+    ttl=config.CHECKPOINT_THREAD_TTL_SECONDS,
+    max_threads=config.CHECKPOINT_MAX_THREADS,
+    prune_interval=config.CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+)
@@ -1,8 +1,223 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+import httpx
 from langchain_community.embeddings import JinaEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings.jina import JINA_API_URL
+from pydantic import PrivateAttr
 from app.config import config
+from app.utils.cache import TTLCache
+
+
+class AsyncJinaEmbeddings(JinaEmbeddings):
+    """JinaEmbeddings with native async calls.
+
+    The upstream class only has a blocking ``requests`` session, so the async
+    methods fall back to a thread pool. This one talks to the Jina API through
+    a shared ``httpx.AsyncClient`` instead.
+    """
+
+    _async_client: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                headers=dict(self.session.headers),
+                timeout=httpx.Timeout(30.0, connect=5.0),
+            )
+        return self._async_client
+
+    async def _aembed(self, input: Any) -> List[List[float]]:
+        response = await self._get_async_client().post(
+            JINA_API_URL, json={"input": input, "model": self.model_name}
+        )
+        # Rate limits and gateway errors come back as HTML or as JSON without "data"
+        if response.is_error:
+            raise RuntimeError(f"Jina embeddings request failed with status {response.status_code}: {response.text[:500]}")
+        resp = response.json()
+        if "data" not in resp:
+            raise RuntimeError(resp.get("detail") or f"Unexpected Jina embeddings response: {str(resp)[:500]}")
+
+        sorted_embeddings = sorted(resp["data"], key=lambda e: e["index"])
+        return [result["embedding"] for result in sorted_embeddings]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed([text]))[0]
+
+
+class EmbeddingStore:
+    """
+    SQLite table of float32 vectors keyed by (model, dimension, sha256 of text)
+
+    The connection is opened on first use so importing the module has no side effects.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " dimension INTEGER NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, dimension, text_hash))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, dimension: int, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = conn.execute(
+                    "SELECT text_hash, vector FROM embeddings"
+                    " WHERE model = ? AND dimension = ?"
+                    f" AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, dimension, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, dimension: int, vectors: Dict[str, List[float]]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimension, text_hash, vector) VALUES (?, ?, ?, ?)",
+                [
+                    (model, dimension, text_hash, array("f", vector).tobytes())
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+            conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of another Embeddings implementation
+
+    Lookups go to an in-memory LRU first, then to the on-disk store, and only
+    the texts found in neither are sent to the underlying model. Identical
+    texts inside one batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        store: EmbeddingStore,
+        model_name: str,
+        dimension: int,
+        memory_size: int = 5000,
+    ):
+        self.underlying = underlying
+        self.store = store
+        self.model_name = model_name
+        self.dimension = dimension
+        self.memory = TTLCache(maxsize=memory_size)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup_memory(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for text_hash in set(hashes):
+            vector = self.memory.get(text_hash)
+            if vector is not None:
+                found[text_hash] = vector
+        self.stats["memory_hits"] += len(found)
+        return found
+
+    def _remember(self, vectors: Dict[str, List[float]]) -> None:
+        for text_hash, vector in vectors.items():
+            self.memory.set(text_hash, vector)
+
+    def _missing(self, texts: List[str], hashes: List[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        return {text_hash: text for text, text_hash in zip(texts, hashes) if text_hash not in found}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(text) for text in texts]
+        found = self._lookup_memory(hashes)
+
+        missing = self._missing(texts, hashes, found)
+        if missing:
+            on_disk = self.store.get_many(self.model_name, self.dimension, list(missing))
+            self.stats["disk_hits"] += len(on_disk)
+            self._remember(on_disk)
+            found.update(on_disk)
+
+        missing = self._missing(texts, hashes, found)
+        if missing:
+            self.stats["misses"] += len(missing)
+            computed = dict(zip(missing, self.underlying.embed_documents(list(missing.values()))))
+            self.store.put_many(self.model_name, self.dimension, computed)
+            self._remember(computed)
+            found.update(computed)
+
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(text) for text in texts]
+        found = self._lookup_memory(hashes)
+
+        missing = self._missing(texts, hashes, found)
+        if missing:
+            on_disk = await asyncio.to_thread(
+                self.store.get_many, self.model_name, self.dimension, list(missing)
+            )
+            self.stats["disk_hits"] += len(on_disk)
+            self._remember(on_disk)
+            found.update(on_disk)
+
+        missing = self._missing(texts, hashes, found)
+        if missing:
+            self.stats["misses"] += len(missing)
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            await asyncio.to_thread(self.store.put_many, self.model_name, self.dimension, computed)
+            self._remember(computed)
+            found.update(computed)
+
+        return [found[text_hash] for text_hash in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "memory": self.memory.stats()}
+
 
-embeddings = JinaEmbeddings(
-    jina_api_key=config.JINA_AI_API_KEY, model_name="jina-embeddings-v4"
+embeddings = CachedEmbeddings(
+    AsyncJinaEmbeddings(jina_api_key=config.JINA_AI_API_KEY, model_name=config.EMBEDDING_MODEL),
+    EmbeddingStore(config.EMBEDDING_CACHE_PATH),
+    model_name=config.EMBEDDING_MODEL,
+    dimension=int(config.EMBEDDING_SIZE),
+    memory_size=config.EMBEDDING_CACHE_MEMORY_SIZE,
 )
 
 
@@ -1,12 +1,27 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import TYPE_CHECKING, Dict
 from app.config import config
 
-large_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=config.GOOGLE_AI_API_KEY
-)
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-small_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=config.GOOGLE_AI_API_KEY
-)   
\ No newline at end of file
+# Built on first use: the Gemini SDK alone takes about a second to import
+_llms: Dict[str, "ChatGoogleGenerativeAI"] = {}
+
+
+def _get_llm(model: str) -> "ChatGoogleGenerativeAI":
+    if model not in _llms:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        _llms[model] = ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=config.GOOGLE_AI_API_KEY
+        )
+    return _llms[model]
+
+
+def get_large_llm() -> "ChatGoogleGenerativeAI":
+    return _get_llm("gemini-2.5-flash")
+
+
+def get_small_llm() -> "ChatGoogleGenerativeAI":
+    return _get_llm("gemini-2.0-flash")
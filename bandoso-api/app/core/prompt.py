@@ -17,3 +17,17 @@ GENERATE_PROMPT = (
     "Câu hỏi: {question} \n"
     "Thông tin: {data}\n"
 )
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation between a visitor and a chatbot about historical sites in at most 5 sentences. "
+    "Keep the places, people and topics the visitor asked about and what they were told. "
+    "Write in the language of the conversation and output only the summary.\n"
+    "Summary of the earlier conversation:"
+    "\n ------- \n"
+    "{summary}"
+    "\n ------- \n"
+    "Newer messages:"
+    "\n ------- \n"
+    "{conversation}"
+    "\n ------- \n"
+)
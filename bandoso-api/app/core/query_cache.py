@@ -1,19 +1,307 @@
-from app.db.qdrant  import cache_vector_store
-from langchain_core.documents import Document
-def add_to_cache(question, answer, metadata: dict = {}):
-    cache_vector_store.add_documents([
-        Document(
-            page_content=question,
-            metadata={**metadata, "answer": answer}
-        )
+import asyncio
+import time
+from typing import Optional
+from qdrant_client import models
+from app.db.qdrant import get_async_client, get_cache_vector_store
+from app.core.embedding import embeddings
+from app.config import config
+from app.utils.cache import TTLCache
+from app.utils.text import question_key
+
+# L1: in-process exact match on (area_id, normalized question hash)
+exact_cache = TTLCache(maxsize=config.QUERY_CACHE_L1_MAX_SIZE, ttl=config.QUERY_CACHE_L1_TTL_SECONDS)
+# Cache point id -> the L1 keys holding its answer, so they go when the point does
+_l1_keys: dict = {}
+# L2: semantic match in the Qdrant cache collection
+semantic_stats = {"hits": 0, "misses": 0}
+
+
+def _cache_exact(key, answer, point_id=None) -> None:
+    exact_cache.set(key, answer)
+    if point_id is not None:
+        _l1_keys.setdefault(str(point_id), set()).add(key)
+
+
+def forget_points(point_ids) -> None:
+    """Drop the L1 answers that came from these cache points."""
+    for point_id in point_ids:
+        for key in _l1_keys.pop(str(point_id), ()):
+            exact_cache.pop(key)
+
+
+def _area_filter(area_id: Optional[str]) -> Optional[models.Filter]:
+    if not area_id:
+        return None
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.area_id", match=models.MatchValue(value=str(area_id)))
     ])
 
-def find_in_cache(question, threshold=0.98):
-    results = cache_vector_store.similarity_search_with_relevance_scores(question, k=1)
+
+def _has_id(point_id) -> models.Filter:
+    # Unlike a list of ids, a filter skips a point that was evicted in the meantime instead of failing
+    return models.Filter(must=[models.HasIdCondition(has_id=[point_id])])
+
+
+class SemanticCacheMaintainer:
+    """
+    Keeps the semantic cache collection bounded
+
+    Every entry carries ``created_at``, ``last_hit_at`` and ``hit_count`` in its
+    metadata. Hits are counted in memory and written back in one batch per
+    compaction instead of one Qdrant write per cache hit; with several workers
+    a concurrent hit can be lost, which only makes the count approximate.
+
+    A compaction deletes the entries not hit for ``ttl`` seconds, then, when
+    the collection holds more than ``max_entries``, evicts the least valuable
+    ones (fewest hits, then least recently hit) down to ``target_ratio`` of the
+    cap, so it does not run again on the next insert.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, target_ratio: float, interval: float, batch_size: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.target_ratio = target_ratio
+        self.interval = interval
+        self.batch_size = batch_size
+        # point id -> [hits since the last flush, hit_count when read, last hit time]
+        self._pending_hits: dict = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "entries": None,
+            "inserted": 0,
+            "deduplicated": 0,
+            "evicted_ttl": 0,
+            "evicted_size": 0,
+            "compactions": 0,
+            "last_compaction_seconds": None,
+            "last_compaction_at": None,
+        }
+
+    @property
+    def collection_name(self) -> str:
+        return get_cache_vector_store().collection_name
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush_hits()
+        except Exception as e:
+            print(f"Error flushing cache hits: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                print(f"Error compacting the semantic cache: {e}")
+
+    # Hits
+
+    def record_hit(self, point_id, hit_count: int) -> None:
+        pending = self._pending_hits.setdefault(point_id, [0, hit_count, 0.0])
+        pending[0] += 1
+        pending[2] = time.time()
+
+    async def flush_hits(self) -> None:
+        if not self._pending_hits:
+            return
+        pending, self._pending_hits = self._pending_hits, {}
+        await get_async_client().batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                models.SetPayloadOperation(set_payload=models.SetPayload(
+                    payload={"hit_count": base + hits, "last_hit_at": last_hit_at},
+                    filter=_has_id(point_id),
+                    key="metadata",
+                ))
+                for point_id, (hits, base, last_hit_at) in pending.items()
+            ],
+        )
+
+    # Compaction
+
+    async def compact(self) -> None:
+        async with self._lock:
+            started = time.monotonic()
+            await self.flush_hits()
+            await self._stamp_legacy_entries()
+            if self.ttl > 0:
+                await self._evict_expired()
+            await self._forget_deleted_points()
+            count = (await get_async_client().count(self.collection_name, exact=True)).count
+            if self.max_entries > 0 and count > self.max_entries:
+                count -= await self._evict_least_valuable(count - int(self.max_entries * self.target_ratio))
+            self.stats["entries"] = count
+            self.stats["compactions"] += 1
+            self.stats["last_compaction_seconds"] = round(time.monotonic() - started, 3)
+            self.stats["last_compaction_at"] = time.time()
+
+    async def _stamp_legacy_entries(self) -> None:
+        # Entries cached before lifecycle tracking start their TTL now
+        now = time.time()
+        await get_async_client().set_payload(
+            collection_name=self.collection_name,
+            payload={"created_at": now, "last_hit_at": now, "hit_count": 0},
+            points=models.Filter(must=[
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="metadata.last_hit_at"))
+            ]),
+            key="metadata",
+        )
+
+    async def _evict_expired(self) -> None:
+        expired = models.Filter(must=[
+            models.FieldCondition(key="metadata.last_hit_at", range=models.Range(lt=time.time() - self.ttl))
+        ])
+        async_client = get_async_client()
+        victims, offset = [], None
+        while True:
+            records, offset = await async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=expired,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            victims.extend(record.id for record in records)
+            if offset is None:
+                break
+        for start in range(0, len(victims), self.batch_size):
+            await async_client.delete(
+                self.collection_name,
+                points_selector=models.PointIdsList(points=victims[start:start + self.batch_size]),
+            )
+        forget_points(victims)
+        self.stats["evicted_ttl"] += len(victims)
+
+    async def _forget_deleted_points(self) -> None:
+        # Points deleted by another worker, or through the API of another worker, are only noticed here
+        for point_id, keys in list(_l1_keys.items()):
+            if not any(key in exact_cache for key in keys):
+                del _l1_keys[point_id]
+        point_ids = list(_l1_keys)
+        for start in range(0, len(point_ids), self.batch_size):
+            batch = point_ids[start:start + self.batch_size]
+            records = await get_async_client().retrieve(
+                self.collection_name, ids=batch, with_payload=False, with_vectors=False
+            )
+            found = {str(record.id) for record in records}
+            forget_points([point_id for point_id in batch if point_id not in found])
+
+    async def _evict_least_valuable(self, excess: int) -> int:
+        async_client = get_async_client()
+        entries, offset = [], None
+        while True:
+            records, offset = await async_client.scroll(
+                collection_name=self.collection_name,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=["metadata.hit_count", "metadata.last_hit_at"],
+                with_vectors=False,
+            )
+            for record in records:
+                metadata = (record.payload or {}).get("metadata") or {}
+                entries.append((metadata.get("hit_count", 0), metadata.get("last_hit_at", 0), record.id))
+            if offset is None:
+                break
+        entries.sort(key=lambda entry: entry[:2])
+        victims = [point_id for _, _, point_id in entries[:excess]]
+        for start in range(0, len(victims), self.batch_size):
+            await async_client.delete(
+                self.collection_name,
+                points_selector=models.PointIdsList(points=victims[start:start + self.batch_size]),
+            )
+        for point_id in victims:
+            self._pending_hits.pop(point_id, None)
+        forget_points(victims)
+        self.stats["evicted_size"] += len(victims)
+        return len(victims)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "pending_hits": len(self._pending_hits),
+        }
+
+
+cache_maintainer = SemanticCacheMaintainer(
+    ttl=config.QUERY_CACHE_L2_TTL_SECONDS,
+    max_entries=config.QUERY_CACHE_L2_MAX_ENTRIES,
+    target_ratio=config.QUERY_CACHE_L2_COMPACT_TARGET_RATIO,
+    interval=config.QUERY_CACHE_L2_COMPACT_INTERVAL_SECONDS,
+)
+
+
+async def add_to_cache(question, answer, metadata: dict = {}, embedding=None) -> bool:
+    """Cache an answer; returns False when it only refreshed a near-identical cached question."""
+    area_id = metadata.get("area_id")
+    if embedding is None:
+        embedding = await embeddings.aembed_query(question)
+    cache_vector_store = get_cache_vector_store()
+    now = time.time()
+
+    # A near-identical question of the same area is already cached: refresh its answer instead
+    duplicates = await search_semantic_cache(embedding, area_id)
+    if duplicates and duplicates[0][1] >= config.QUERY_CACHE_L2_DEDUPE_THRESHOLD:
+        point_id = duplicates[0][0].metadata["_id"]
+        await get_async_client().set_payload(
+            collection_name=cache_vector_store.collection_name,
+            payload={"answer": answer, "updated_at": now},
+            points=_has_id(point_id),
+            key="metadata",
+        )
+        cache_maintainer.stats["deduplicated"] += 1
+        inserted = False
+    else:
+        metadata = {**metadata, "answer": answer, "created_at": now, "last_hit_at": now, "hit_count": 0}
+        point_id = (await cache_vector_store.aadd_embeddings([question], [embedding], [metadata]))[0]
+        cache_maintainer.stats["inserted"] += 1
+        inserted = True
+    _cache_exact(question_key(question, area_id), answer, point_id)
+    return inserted
+
+def find_in_exact_cache(question, area_id=None):
+    return exact_cache.get(question_key(question, area_id))
+
+def similarity_threshold(area_id=None) -> float:
+    return float(config.QUERY_CACHE_L2_AREA_THRESHOLDS.get(str(area_id), config.QUERY_CACHE_L2_THRESHOLD))
+
+async def search_semantic_cache(embedding, area_id=None, k=1):
+    """The k closest cached questions of the area, with their relevance scores."""
+    return await get_cache_vector_store().asimilarity_search_with_relevance_scores_by_vector(
+        embedding, k=k, filter=_area_filter(area_id)
+    )
+
+async def find_in_semantic_cache(question, embedding, area_id=None, threshold=None):
+    if threshold is None:
+        threshold = similarity_threshold(area_id)
+    results = await search_semantic_cache(embedding, area_id)
     if results:
         print(results)
         doc, score = results[0]
         if score >= threshold:
-            return doc.metadata.get("answer", "")
+            semantic_stats["hits"] += 1
+            cache_maintainer.record_hit(doc.metadata["_id"], doc.metadata.get("hit_count", 0))
+            answer = doc.metadata.get("answer", "")
+            _cache_exact(question_key(question, area_id), answer, doc.metadata["_id"])
+            return answer
+    semantic_stats["misses"] += 1
     return None
 
+def get_cache_stats() -> dict:
+    return {
+        "l1": exact_cache.stats(),
+        "l2": {**semantic_stats, "lifecycle": cache_maintainer.get_stats()},
+    }
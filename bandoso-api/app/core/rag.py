@@ -1,55 +1,183 @@
-from typing import TypedDict, List, Optional
+import asyncio
+import time
+from typing import Annotated, TypedDict, List, Optional
 from app.services.area import increment_area_request_count
+from app.services.side_effects import side_effects
 from langgraph.graph import MessagesState
 from app.core.query_cache import *
-from langchain_core.messages import SystemMessage, RemoveMessage, HumanMessage
+from langchain_core.messages import AnyMessage, SystemMessage, RemoveMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import add_messages
+from langgraph.constants import TAG_NOSTREAM
 
-from langgraph.checkpoint.memory import InMemorySaver
+from app.core.checkpointer import checkpointer
+from app.config import config
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.prebuilt import tools_condition
 
 from langgraph.graph import MessagesState
 from typing import Optional, Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.core.llm import large_llm, small_llm
-from app.core.tools import doc_retriever_tool 
+from app.core.llm import get_large_llm, get_small_llm
+from app.core.tools import doc_retriever_tool, search_documents, query_similarity, speculative_stats
+from app.core.routing import RETRIEVE, route_question, retrieval_tool_call, record_fast_path, record_llm_decision
 from langchain_core.messages import convert_to_messages
-from app.core.prompt  import REWRITE_PROMPT, GENERATE_PROMPT
+from app.core.prompt  import REWRITE_PROMPT, GENERATE_PROMPT, SUMMARY_PROMPT
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.prebuilt import tools_condition
 
 
 class ConversationState(TypedDict):
-    messages: MessagesState = []
+    # Nodes return only the messages they add; compact_conversation removes old ones
+    messages: Annotated[List[AnyMessage], add_messages]
+    # Turns older than the recent ones, summarized by compact_conversation
     summary: str
     question: str
     response: str
     context: Optional[str]
     metadata: Optional[dict]
     area_id: Optional[str]
+    # Embedded once per request and reused by cache lookup, retrieval and cache insert
+    question_embedding: Optional[List[float]]
+    # Documents found while the routing call was running, see _speculate
+    speculative_retrieval: Optional[dict]
+    # Set by cache warm-up runs, which must not use up the area's quota
+    warmup: Optional[bool]
 
 
-def generate_query_or_respond(state: ConversationState):
-    messages = state.get("messages", [])
+async def _speculate(state: ConversationState, response_task: asyncio.Task):
+    """
+    Search for the raw question while the model decides, and keep the results
+    only when its tool query is close enough to the question
+    """
+    question = state["question"]
+    search = asyncio.create_task(search_documents(
+        question, question, state.get("question_embedding"), state.get("area_id")
+    ))
+    try:
+        response = await response_task
+    except BaseException:
+        search.cancel()
+        raise
+
+    tool_query = response.tool_calls[0]["args"].get("query", "") if response.tool_calls else None
+    if tool_query is None:
+        search.cancel()
+        speculative_stats["cancelled"] += 1
+        return response, None
+    if query_similarity(tool_query, question) < config.SPECULATIVE_RETRIEVAL_MIN_SIMILARITY:
+        search.cancel()
+        speculative_stats["discarded"] += 1
+        return response, None
+
+    try:
+        documents = await search
+    except Exception as e:
+        print(f"Error in speculative retrieval: {e}")
+        return response, None
+    speculative_stats["used"] += 1
+    return response, {"query": tool_query, "documents": documents}
+
+async def generate_query_or_respond(state: ConversationState):
     print("QUESTION:", state["question"])
-    response = (
-        large_llm
-        .bind_tools([doc_retriever_tool]).invoke(state["question"])
-    )
+    speculative = None
+    started = time.monotonic()
+    if await route_question(state["question"], state.get("question_embedding")) == RETRIEVE:
+        # Confident it needs the documents: skip the tool-decision call
+        response = retrieval_tool_call(state["question"])
+        record_fast_path(time.monotonic() - started)
+    else:
+        started = time.monotonic()
+        response_task = asyncio.ensure_future(
+            get_large_llm()
+            .bind_tools([doc_retriever_tool]).ainvoke(state["question"])
+        )
+        if config.SPECULATIVE_RETRIEVAL:
+            response, speculative = await _speculate(state, response_task)
+        else:
+            response = await response_task
+        record_llm_decision(time.monotonic() - started)
     print("RESPONSE:", response)
-    return {**state, "messages": messages + [HumanMessage(content=state["question"]), response]}
+    return {
+        "messages": [HumanMessage(content=state["question"]), response],
+        "speculative_retrieval": speculative,
+    }
 
-def generate_answer(state: ConversationState):
+async def generate_answer(state: ConversationState):
     question = state["question"]
     data = state["messages"][-1].content
     context = state["context"]
     prompt = GENERATE_PROMPT.format(question=question, data=data, context=context)
-    response = large_llm.invoke([{"role": "user", "content": prompt}])
-    add_to_cache(question, response.content, {**state["metadata"], "area_id": state["area_id"]})
-    increment_area_request_count(state["area_id"])
-    return {**state, "messages":state["messages"] + [response], "response": response.content}
+    response = await get_large_llm().ainvoke([{"role": "user", "content": prompt}])
+    # Run after the answer is streamed instead of holding the response open
+    cache_metadata = {**state["metadata"], "area_id": state["area_id"]}
+    await side_effects.submit("cache_insert", lambda: add_to_cache(
+        question, response.content, cache_metadata, embedding=state.get("question_embedding")
+    ))
+    if not state.get("warmup"):
+        await side_effects.submit("request_count", lambda: increment_area_request_count(state["area_id"]))
+    return {"messages": [response], "response": response.content}
+
+
+compaction_stats = {"compactions": 0, "messages_removed": 0, "failures": 0}
+
+
+def _over_budget(messages: list) -> bool:
+    return (len(messages) > config.CONVERSATION_MAX_MESSAGES
+            or count_tokens_approximately(messages) > config.CONVERSATION_MAX_TOKENS)
+
+
+def _recent_start(messages: list) -> int:
+    """Index of the first message of the last CONVERSATION_KEEP_TURNS turns."""
+    if config.CONVERSATION_KEEP_TURNS <= 0:
+        return len(messages)
+    questions = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if len(questions) < config.CONVERSATION_KEEP_TURNS:
+        return 0
+    return questions[-config.CONVERSATION_KEEP_TURNS]
+
+
+def _transcript(messages: list) -> str:
+    # Questions and answers only: tool calls and retrieved documents are not worth summarizing
+    lines = []
+    for message in messages:
+        if isinstance(message.content, str) and message.content.strip() and message.type in ("human", "ai"):
+            speaker = "Visitor" if message.type == "human" else "Assistant"
+            lines.append(f"{speaker}: {message.content.strip()}")
+    return "\n".join(lines)
+
+
+async def compact_conversation(state: ConversationState):
+    """
+    Keep the checkpointed conversation within its budget
+
+    Past CONVERSATION_MAX_MESSAGES messages or CONVERSATION_MAX_TOKENS
+    estimated tokens, the turns before the last CONVERSATION_KEEP_TURNS are
+    folded into the summary by the small model and removed from the state.
+    If the summary cannot be written the turns are removed anyway, so a
+    model outage cannot make threads grow without bound.
+    """
+    messages = state.get("messages") or []
+    if not _over_budget(messages):
+        return {}
+    old = messages[:_recent_start(messages)]
+    if not old:
+        return {}
+    summary = state.get("summary") or ""
+    transcript = _transcript(old)
+    if transcript:
+        try:
+            response = await get_small_llm().with_config(tags=[TAG_NOSTREAM]).ainvoke(
+                SUMMARY_PROMPT.format(summary=summary or "-", conversation=transcript)
+            )
+            summary = response.content
+        except Exception as e:
+            print(f"Error summarizing the conversation: {e}")
+            compaction_stats["failures"] += 1
+    compaction_stats["compactions"] += 1
+    compaction_stats["messages_removed"] += len(old)
+    return {"summary": summary, "messages": [RemoveMessage(id=message.id) for message in old]}
 
 workflow = StateGraph(ConversationState)
 
@@ -57,20 +185,29 @@ workflow.add_node(generate_query_or_respond)
 # workflow.add_node(rewrite_question)
 workflow.add_node("retrieve", ToolNode([doc_retriever_tool]))
 workflow.add_node(generate_answer)
+workflow.add_node(compact_conversation)
 workflow.add_edge(START, "generate_query_or_respond")
 workflow.add_conditional_edges(
     "generate_query_or_respond",
         tools_condition,
     {
         "tools": "retrieve",
-        END: END,
+        END: "compact_conversation",
     },
 )
 
 workflow.add_edge("retrieve", "generate_answer")
-workflow.add_edge("generate_answer", END)
+workflow.add_edge("generate_answer", "compact_conversation")
+workflow.add_edge("compact_conversation", END)
+
+_graph = None
+
 
-memory = InMemorySaver()
-graph = workflow.compile(
-    checkpointer=memory
-)
\ No newline at end of file
+def get_graph():
+    """Compile the workflow on first use; the app lifespan does it at startup."""
+    global _graph
+    if _graph is None:
+        _graph = workflow.compile(
+            checkpointer=checkpointer
+        )
+    return _graph
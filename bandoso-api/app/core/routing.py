@@ -0,0 +1,238 @@
+import asyncio
+import math
+import re
+import time
+import unicodedata
+import uuid
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from app.config import config
+from app.core.embedding import embeddings
+from app.core.llm import get_small_llm
+from app.core.tools import doc_retriever_tool, speculative_stats
+from app.utils.text import normalize_question
+
+RETRIEVE = "retrieve"
+LLM = "llm"
+
+# Short greetings and chit-chat that the tool-calling model should answer itself
+SMALL_TALK = [
+    "xin chào", "chào bạn", "chào", "hello", "hi", "hey", "cảm ơn", "cám ơn", "thank you", "thanks",
+    "tạm biệt", "bye", "bạn là ai", "bạn tên gì", "bạn khỏe không", "ok", "oke", "vâng", "dạ",
+]
+
+# Words that name a place, an event or a person the sites are about
+TOPIC_SIGNALS = [
+    "giới thiệu", "kể về", "lịch sử", "di tích", "đền", "chùa", "đình", "miếu", "bảo tàng", "địa đạo",
+    "chiến khu", "căn cứ", "trận", "chiến dịch", "anh hùng", "liệt sĩ", "tượng đài", "xây dựng", "thành lập",
+    "ý nghĩa", "kiến trúc", "lễ hội", "history",
+]
+
+# Words that make a sentence a question, whatever it is about
+QUESTION_SIGNALS = [
+    "là gì", "ở đâu", "khi nào", "năm nào", "bao giờ", "ai là", "là ai", "tại sao", "vì sao", "như thế nào",
+    "thế nào", "bao nhiêu", "what", "where", "when", "who", "why", "how",
+]
+
+# Example questions for the embedding router
+RETRIEVE_EXAMPLES = [
+    "Di tích này được xây dựng vào năm nào?",
+    "Giới thiệu về lịch sử của địa điểm này",
+    "Ai là người đã lãnh đạo trận đánh ở đây?",
+    "Địa đạo Củ Chi nằm ở đâu?",
+    "Ý nghĩa của tượng đài này là gì?",
+    "Kể cho tôi nghe về chiến dịch Hồ Chí Minh",
+    "Bảo tàng mở cửa vào những giờ nào?",
+]
+SMALL_TALK_EXAMPLES = [
+    "Xin chào",
+    "Cảm ơn bạn nhiều",
+    "Bạn là ai?",
+    "Tạm biệt nhé",
+    "Bạn khỏe không?",
+]
+
+ROUTER_PROMPT = (
+    "Bạn là bộ định tuyến cho chatbot về di tích lịch sử, văn hóa, du lịch. "
+    "Nếu câu hỏi cần tra cứu thông tin trong cơ sở dữ liệu, trả lời đúng một từ RETRIEVE. "
+    "Nếu đó là lời chào, cảm ơn hoặc trò chuyện không cần tra cứu, trả lời đúng một từ DIRECT.\n"
+    "Câu hỏi: {question}"
+)
+
+routing_stats = {
+    "decisions": {},
+    "fast_path": 0,
+    "llm_calls": 0,
+    "llm_seconds": 0.0,
+    "router_seconds": 0.0,
+    "saved_seconds": 0.0,
+}
+
+_example_vectors: Optional[Tuple[List[List[float]], List[List[float]]]] = None
+_example_lock = asyncio.Lock()
+
+
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _words(text: str) -> str:
+    # Punctuation only separates words: "chào," is "chào" and "2+2" is "2 2"
+    return f" {_WORD_SEPARATORS.sub(' ', normalize_question(text)).strip()} "
+
+
+def _fold(text: str) -> str:
+    # Users often type without diacritics, so compare on the bare letters
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return text.replace("đ", "d")
+
+
+def _phrases(phrases: List[str]) -> List[Tuple[str, bool]]:
+    # Folded, one syllable collides with common words ("đền"/"đến", "chùa"/"chưa", "đình"/"định"),
+    # so only phrases of several syllables are also matched without diacritics
+    compiled = []
+    for phrase in phrases:
+        words = _words(phrase)
+        folded = len(words.split()) > 1
+        compiled.append((_fold(words) if folded else words, folded))
+    return compiled
+
+
+_SMALL_TALK = _phrases(SMALL_TALK)
+_TOPIC_SIGNALS = _phrases(TOPIC_SIGNALS)
+_QUESTION_SIGNALS = _phrases(QUESTION_SIGNALS)
+
+
+def heuristic_route(question: str) -> Tuple[str, float]:
+    words = _words(question)
+    forms = {False: words, True: _fold(words)}
+    topic = sum(1 for phrase, folded in _TOPIC_SIGNALS if phrase in forms[folded])
+    if not topic and any(forms[folded].startswith(phrase) for phrase, folded in _SMALL_TALK):
+        return LLM, 0.9
+    asks = "?" in question or any(phrase in forms[folded] for phrase, folded in _QUESTION_SIGNALS)
+    if topic >= 2 or (topic and asks):
+        return RETRIEVE, 0.9
+    if topic:
+        return RETRIEVE, 0.75
+    # A question without any site word may be about anything (the weather, arithmetic): the model decides
+    if asks:
+        return RETRIEVE, 0.5
+    # Longer statements without question words are usually still about a site
+    return RETRIEVE, 0.6 if len(words.split()) > 6 else 0.4
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+async def _get_example_vectors() -> Tuple[List[List[float]], List[List[float]]]:
+    global _example_vectors
+    async with _example_lock:
+        if _example_vectors is None:
+            vectors = await embeddings.aembed_documents(RETRIEVE_EXAMPLES + SMALL_TALK_EXAMPLES)
+            _example_vectors = (vectors[:len(RETRIEVE_EXAMPLES)], vectors[len(RETRIEVE_EXAMPLES):])
+    return _example_vectors
+
+
+async def embedding_route(question: str, question_embedding: Optional[List[float]]) -> Tuple[str, float]:
+    if question_embedding is None:
+        question_embedding = await embeddings.aembed_query(question)
+    retrieve_vectors, small_talk_vectors = await _get_example_vectors()
+    retrieve_score = max(_cosine(question_embedding, vector) for vector in retrieve_vectors)
+    small_talk_score = max(_cosine(question_embedding, vector) for vector in small_talk_vectors)
+    if small_talk_score > retrieve_score:
+        return LLM, small_talk_score
+    return RETRIEVE, retrieve_score
+
+
+async def small_llm_route(question: str) -> Tuple[str, float]:
+    # Runs inside an answer node: keep its output out of the visitor's token stream
+    response = await get_small_llm().with_config(tags=[TAG_NOSTREAM]).ainvoke(ROUTER_PROMPT.format(question=question))
+    answer = str(response.content).strip().upper()
+    if answer.startswith("RETRIEVE"):
+        return RETRIEVE, 1.0
+    if answer.startswith("DIRECT"):
+        return LLM, 1.0
+    return LLM, 0.0
+
+
+async def route_question(question: str, question_embedding: Optional[List[float]] = None) -> str:
+    """
+    Decide whether a question can go straight to retrieval
+
+    Args:
+        question: The user's question
+        question_embedding: The question's vector, if already computed
+
+    Returns:
+        str: RETRIEVE to skip the tool-decision call, LLM to let the model decide
+    """
+    mode = config.ROUTER_MODE
+    if mode == "llm":
+        return LLM
+
+    started = time.monotonic()
+    try:
+        if mode == "heuristic":
+            route, confidence = heuristic_route(question)
+            threshold = config.ROUTER_CONFIDENCE_THRESHOLD
+        elif mode == "embedding":
+            route, confidence = await embedding_route(question, question_embedding)
+            threshold = config.ROUTER_EMBEDDING_THRESHOLD
+        elif mode == "small_llm":
+            route, confidence = await small_llm_route(question)
+            threshold = config.ROUTER_CONFIDENCE_THRESHOLD
+        else:
+            raise ValueError(f"Unknown router mode: {mode}")
+    except Exception as e:
+        print(f"Error routing question: {e}")
+        route, confidence, threshold = LLM, 0.0, 1.0
+    routing_stats["router_seconds"] += time.monotonic() - started
+
+    decision = route if route == RETRIEVE and confidence >= threshold else LLM
+    key = f"{mode}:{decision}"
+    routing_stats["decisions"][key] = routing_stats["decisions"].get(key, 0) + 1
+    return decision
+
+
+def retrieval_tool_call(question: str) -> AIMessage:
+    """Stand-in for the model's reply when the router already chose retrieval."""
+    return AIMessage(
+        content="",
+        tool_calls=[{
+            "name": doc_retriever_tool.name,
+            "args": {"query": question},
+            "id": f"route_{uuid.uuid4().hex}",
+            "type": "tool_call",
+        }],
+    )
+
+
+def record_llm_decision(seconds: float) -> None:
+    routing_stats["llm_calls"] += 1
+    routing_stats["llm_seconds"] += seconds
+
+
+def record_fast_path(router_seconds: float) -> None:
+    routing_stats["fast_path"] += 1
+    if routing_stats["llm_calls"]:
+        # Credit the average tool-decision call we did not make, minus the router's own time
+        average = routing_stats["llm_seconds"] / routing_stats["llm_calls"]
+        routing_stats["saved_seconds"] += average - router_seconds
+
+
+def get_routing_stats() -> dict:
+    decided = routing_stats["fast_path"] + routing_stats["llm_calls"]
+    return {
+        **routing_stats,
+        "decisions": dict(routing_stats["decisions"]),
+        "speculative": {**speculative_stats, "enabled": config.SPECULATIVE_RETRIEVAL},
+        "mode": config.ROUTER_MODE,
+        "fast_path_rate": routing_stats["fast_path"] / decided if decided else 0.0,
+        "avg_llm_seconds": routing_stats["llm_seconds"] / routing_stats["llm_calls"] if routing_stats["llm_calls"] else 0.0,
+    }
@@ -1,12 +1,63 @@
-from langchain.tools.retriever import create_retriever_tool
-from app.db.qdrant import doc_vector_store
-
+from typing import Annotated, List, Optional
+from langgraph.prebuilt import InjectedState
+from langchain_core.documents import Document
+from app.db.qdrant import get_doc_vector_store
+from app.utils.text import normalize_question
+from app.config import config
+from qdrant_client import models
 
 from langchain_core.tools import tool
 
-@tool
-def doc_retriever_tool(query:str) ->str:
-    "Tìm kiếm và trả về thông tin về địa điểm lịch sử, văn hóa, du lịch, kiến thức trong cơ sở dữ liệu."
-    documents = doc_vector_store.similarity_search(query, k=5)
+speculative_stats = {"used": 0, "discarded": 0, "cancelled": 0}
+
+
+def format_documents(documents: List[Document]) -> str:
     return "\n".join([doc.page_content for doc in documents])
 
+
+def area_filter(area_id: Optional[str]) -> Optional[models.Filter]:
+    """Scope a chunk search to one area's tenant, plus the shared documents."""
+    if not area_id:
+        return None
+    area_ids = [str(area_id)]
+    if config.INCLUDE_SHARED_DOCUMENTS:
+        area_ids.append(config.SHARED_AREA_ID)
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.area_id", match=models.MatchAny(any=area_ids))
+    ])
+
+
+async def search_documents(
+    query: str,
+    question: str = "",
+    question_embedding: Optional[List[float]] = None,
+    area_id: Optional[str] = None,
+) -> str:
+    search_filter = area_filter(area_id)
+    doc_vector_store = get_doc_vector_store()
+    # The model usually passes the question through unchanged: reuse its vector
+    if question_embedding is not None and normalize_question(query) == normalize_question(question):
+        documents = await doc_vector_store.asimilarity_search_by_vector(question_embedding, k=5, filter=search_filter)
+    else:
+        documents = await doc_vector_store.asimilarity_search(query, k=5, filter=search_filter)
+    return format_documents(documents)
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the normalized words of two queries."""
+    words_a, words_b = set(normalize_question(a).split()), set(normalize_question(b).split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+@tool
+async def doc_retriever_tool(query:str, state: Annotated[dict, InjectedState]) ->str:
+    "Tìm kiếm và trả về thông tin về địa điểm lịch sử, văn hóa, du lịch, kiến thức trong cơ sở dữ liệu."
+    # Results searched while the model was still deciding, accepted for this exact query
+    speculative = state.get("speculative_retrieval")
+    if speculative and speculative["query"] == query:
+        return speculative["documents"]
+    return await search_documents(
+        query, state.get("question", ""), state.get("question_embedding"), state.get("area_id")
+    )
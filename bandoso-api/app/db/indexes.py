@@ -0,0 +1,142 @@
+from typing import Dict, Iterable, Union
+
+from qdrant_client import models
+
+from app.config import config
+from app.db.qdrant import get_async_client
+from app.db.profiles import PROFILE_PREFIXES
+
+IndexSchema = Union[models.PayloadSchemaType, models.KeywordIndexParams]
+
+
+def _parse_indexes(spec: str) -> Dict[str, IndexSchema]:
+    # "area_id:keyword:tenant,year:integer" -> {"metadata.area_id": <tenant keyword>, "metadata.year": INTEGER}
+    indexes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, rest = item.partition(":")
+        schema, _, flag = rest.partition(":")
+        schema = models.PayloadSchemaType((schema.strip() or "keyword").lower())
+        if flag.strip().lower() == "tenant":
+            if schema != models.PayloadSchemaType.KEYWORD:
+                raise ValueError(f"Tenant index {key} must be a keyword index")
+            # Qdrant co-locates each tenant's points and builds a graph per tenant
+            schema = models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+        indexes[f"metadata.{key.strip()}"] = schema
+    return indexes
+
+
+# collection -> payload field -> index type, for every metadata key the app filters on
+PAYLOAD_INDEXES: Dict[str, Dict[str, IndexSchema]] = {
+    config.CHUNK_COLLECTION_NAME: _parse_indexes(config.CHUNK_PAYLOAD_INDEXES),
+    config.CACHE_COLLECTION_NAME: _parse_indexes(config.CACHE_PAYLOAD_INDEXES),
+}
+
+_warned: set[tuple[str, str]] = set()
+unindexed_queries: Dict[str, int] = {}
+
+
+def _describe(schema: IndexSchema) -> str:
+    if isinstance(schema, models.KeywordIndexParams):
+        return "keyword:tenant" if schema.is_tenant else "keyword"
+    return schema.value
+
+
+def _describe_existing(info: models.PayloadIndexInfo) -> str:
+    data_type = info.data_type.value if hasattr(info.data_type, "value") else str(info.data_type)
+    if getattr(info.params, "is_tenant", False):
+        return f"{data_type}:tenant"
+    return data_type
+
+
+async def reconcile_payload_indexes() -> None:
+    """
+    Create the configured payload indexes that are missing and rebuild the
+    ones whose type changed. Indexes that are not configured are left alone.
+    """
+    async_client = get_async_client()
+    for collection_name, indexes in PAYLOAD_INDEXES.items():
+        info = await async_client.get_collection(collection_name)
+        existing = info.payload_schema or {}
+        for field_name, schema in indexes.items():
+            current = existing.get(field_name)
+            if current is not None and _describe_existing(current) == _describe(schema):
+                continue
+            if current is not None:
+                print(f"Rebuilding payload index {collection_name}.{field_name}: {_describe_existing(current)} -> {_describe(schema)}")
+                await async_client.delete_payload_index(collection_name, field_name)
+            else:
+                print(f"Creating payload index {collection_name}.{field_name} ({_describe(schema)})")
+            await async_client.create_payload_index(collection_name, field_name, field_schema=schema)
+
+    for collection_name in PAYLOAD_INDEXES:
+        await _reconcile_tenant_hnsw(collection_name)
+
+
+async def _reconcile_tenant_hnsw(collection_name: str) -> None:
+    # payload_m builds a graph per tenant value; m=0 skips the global graph,
+    # which only unscoped searches (no area_id) would use, as a full scan
+    prefix = PROFILE_PREFIXES[collection_name]
+    m = getattr(config, f"{prefix}_HNSW_M")
+    payload_m = getattr(config, f"{prefix}_HNSW_PAYLOAD_M")
+    async_client = get_async_client()
+    info = await async_client.get_collection(collection_name)
+    hnsw = info.config.hnsw_config
+    if m == 0 and hnsw.m != 0:
+        # Dropping the global graph hides untagged chunks and slows unscoped and shared-area
+        # searches, so it is left to the backfill CLI, once every chunk has an area
+        print(f"Keeping the global HNSW graph of {collection_name}; "
+              "run python -m app.cli.backfill_area_ids --drop-global-graph to remove it")
+        m = hnsw.m
+    if hnsw.m == m and (hnsw.payload_m or 0) == payload_m:
+        return
+    print(f"Updating HNSW of {collection_name}: m={m}, payload_m={payload_m}")
+    await async_client.update_collection(
+        collection_name,
+        hnsw_config=models.HnswConfigDiff(m=m, payload_m=payload_m),
+    )
+
+
+async def get_index_status() -> dict:
+    async_client = get_async_client()
+    status = {}
+    for collection_name, indexes in PAYLOAD_INDEXES.items():
+        info = await async_client.get_collection(collection_name)
+        existing = info.payload_schema or {}
+        fields = {}
+        for field_name, schema in indexes.items():
+            current = existing.get(field_name)
+            if current is None:
+                state = "missing"
+            elif _describe_existing(current) != _describe(schema):
+                state = "type_mismatch"
+            else:
+                state = "indexed"
+            fields[field_name] = {
+                "type": _describe(schema),
+                "status": state,
+                "points": current.points if current is not None else 0,
+            }
+        status[collection_name] = {
+            "points": info.points_count,
+            "hnsw": {"m": info.config.hnsw_config.m, "payload_m": info.config.hnsw_config.payload_m},
+            "indexes": fields,
+            "unmanaged": {
+                field_name: _describe_existing(current)
+                for field_name, current in existing.items()
+                if field_name not in indexes
+            },
+        }
+    return {"collections": status, "unindexed_queries": dict(unindexed_queries)}
+
+
+def check_indexed(collection_name: str, field_names: Iterable[str]) -> None:
+    """Warn, once per field, about filters that will scan the whole collection."""
+    indexes = PAYLOAD_INDEXES.get(collection_name, {})
+    for field_name in field_names:
+        if field_name in indexes:
+            continue
+        key = f"{collection_name}.{field_name}"
+        unindexed_queries[key] = unindexed_queries.get(key, 0) + 1
+        if (collection_name, field_name) not in _warned:
+            _warned.add((collection_name, field_name))
+            print(f"Warning: filtering {collection_name} on un-indexed payload field {field_name}; add it to the payload index config")
@@ -0,0 +1,64 @@
+from qdrant_client import models
+
+from app.config import config
+
+# Config prefix of each collection's profile settings
+PROFILE_PREFIXES = {
+    config.CHUNK_COLLECTION_NAME: "CHUNK",
+    config.CACHE_COLLECTION_NAME: "CACHE",
+}
+
+
+def _setting(prefix: str, name: str):
+    return getattr(config, f"{prefix}_{name}")
+
+
+def quantization_config(prefix: str):
+    kind = _setting(prefix, "QUANTIZATION").lower()
+    always_ram = _setting(prefix, "QUANTIZATION_ALWAYS_RAM")
+    if kind == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram,
+        ))
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=always_ram))
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown quantization for {prefix}: {kind}")
+
+
+def collection_profile(collection_name: str) -> dict:
+    """
+    The create_collection arguments for a collection, from its config profile
+
+    Quantized vectors stay in RAM for the HNSW search while the full-precision
+    originals can live on disk, where they are only read to rescore the
+    oversampled candidates.
+    """
+    prefix = PROFILE_PREFIXES[collection_name]
+    return {
+        "vectors_config": models.VectorParams(
+            size=int(config.EMBEDDING_SIZE),
+            distance=models.Distance.COSINE,
+            on_disk=_setting(prefix, "VECTORS_ON_DISK"),
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=_setting(prefix, "HNSW_M"),
+            payload_m=_setting(prefix, "HNSW_PAYLOAD_M") or None,
+            ef_construct=_setting(prefix, "HNSW_EF_CONSTRUCT"),
+        ),
+        "quantization_config": quantization_config(prefix),
+        "on_disk_payload": _setting(prefix, "PAYLOAD_ON_DISK"),
+    }
+
+
+def search_params(collection_name: str) -> models.SearchParams:
+    prefix = PROFILE_PREFIXES[collection_name]
+    quantized = _setting(prefix, "QUANTIZATION").lower() != "none"
+    return models.SearchParams(
+        hnsw_ef=_setting(prefix, "SEARCH_EF"),
+        quantization=models.QuantizationSearchParams(
+            rescore=_setting(prefix, "RESCORE"),
+            oversampling=_setting(prefix, "OVERSAMPLING"),
+        ) if quantized else None,
+    )
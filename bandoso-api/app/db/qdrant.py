@@ -1,36 +1,103 @@
+from typing import Optional
 from app.core.embedding import embeddings
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance
 from app.config import config
-from langchain_qdrant import QdrantVectorStore
+from app.db.vector_store import AsyncQdrantVectorStore
+from app.db.qdrant_pool import PooledAsyncQdrantClient
+from app.db.profiles import collection_profile, search_params
+
+# Clients and vector stores are built on first use, so importing this module
+# never opens a connection. The app lifespan calls ensure_collections().
+# The sync client only creates collections and backs the langchain constructor; requests use the async pool
+_client: Optional[QdrantClient] = None
+_async_client: Optional[PooledAsyncQdrantClient] = None
+_vector_stores: dict[str, AsyncQdrantVectorStore] = {}
+
+
+def get_client() -> QdrantClient:
+   global _client
+   if _client is None:
+      _client = QdrantClient(host=config.QDRANT_HOST, port=config.QDRANT_PORT, timeout=config.QDRANT_TIMEOUT_SECONDS)
+   return _client
+
+
+def get_async_client() -> PooledAsyncQdrantClient:
+   global _async_client
+   if _async_client is None:
+      _async_client = PooledAsyncQdrantClient(
+         size=config.QDRANT_POOL_SIZE,
+         retries=config.QDRANT_RETRIES,
+         backoff=config.QDRANT_RETRY_BACKOFF_SECONDS,
+         host=config.QDRANT_HOST,
+         port=int(config.QDRANT_PORT),
+         grpc_port=config.QDRANT_GRPC_PORT,
+         prefer_grpc=config.QDRANT_PREFER_GRPC,
+         timeout=config.QDRANT_TIMEOUT_SECONDS,
+         check_compatibility=False,
+      )
+   return _async_client
 
-# Initialize Qdrant client using config
-client = QdrantClient(host=config.QDRANT_HOST, port=config.QDRANT_PORT)
 
 # SETUP COLLECTIONS
+# The configured names may be aliases, pointing at the collection built by app.cli.migrate_collection
+
+def collection_exists(name: str) -> bool:
+   client = get_client()
+   if client.collection_exists(name):
+      return True
+   return any(alias.alias_name == name for alias in client.get_aliases().aliases)
+
+
+def ensure_collections() -> None:
+   """
+   Create the chunk and cache collections when missing, and check that the
+   existing ones match the embedding size. Blocking: run it in a thread.
+   """
+   client = get_client()
+   for collection_name in (config.CHUNK_COLLECTION_NAME, config.CACHE_COLLECTION_NAME):
+      if not collection_exists(collection_name):
+         print(f"Creating collection {collection_name}")
+         client.create_collection(
+            collection_name=collection_name,
+            **collection_profile(collection_name),
+         )
+         continue
+      vectors = client.get_collection(collection_name).config.params.vectors
+      if vectors.size != int(config.EMBEDDING_SIZE):
+         raise ValueError(
+            f"Collection {collection_name} has vectors of size {vectors.size}, "
+            f"but EMBEDDING_SIZE is {config.EMBEDDING_SIZE}"
+         )
+
+
+def _vector_store(collection_name: str) -> AsyncQdrantVectorStore:
+   if collection_name not in _vector_stores:
+      _vector_stores[collection_name] = AsyncQdrantVectorStore(
+         client=get_client(),
+         async_client=get_async_client(),
+         collection_name=collection_name,
+         embedding=embeddings,
+         search_params=search_params(collection_name),
+         # Checked once by ensure_collections instead of a request per store
+         validate_collection_config=False,
+      )
+   return _vector_stores[collection_name]
+
+
+def get_doc_vector_store() -> AsyncQdrantVectorStore:
+   return _vector_store(config.CHUNK_COLLECTION_NAME)
+
+
+def get_cache_vector_store() -> AsyncQdrantVectorStore:
+   return _vector_store(config.CACHE_COLLECTION_NAME)
+
 
-## CHUNK COLLECTION
-if not client.collection_exists(config.CHUNK_COLLECTION_NAME):
-   client.create_collection(
-      collection_name=config.CHUNK_COLLECTION_NAME,
-      vectors_config=VectorParams(size=config.EMBEDDING_SIZE, distance=Distance.COSINE),
-   )
-
-## CACHE COLLECTION
-if not client.collection_exists(config.CACHE_COLLECTION_NAME):
-   client.create_collection(
-      collection_name=config.CACHE_COLLECTION_NAME,
-      vectors_config=VectorParams(size=config.EMBEDDING_SIZE, distance=Distance.COSINE),
-   )
-   
-doc_vector_store = QdrantVectorStore(
-    client=client,
-    collection_name=config.CHUNK_COLLECTION_NAME,
-    embedding=embeddings,
-)
-
-cache_vector_store = QdrantVectorStore(
-    client=client,
-    collection_name=config.CACHE_COLLECTION_NAME,
-    embedding=embeddings,
-)
\ No newline at end of file
+async def close_clients() -> None:
+   global _client, _async_client
+   if _async_client is not None:
+      await _async_client.close()
+      _async_client = None
+   if _client is not None:
+      _client.close()
+      _client = None
+   _vector_stores.clear()
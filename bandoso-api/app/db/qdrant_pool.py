@@ -0,0 +1,76 @@
+import asyncio
+import inspect
+import itertools
+import random
+from typing import Any, Callable
+
+import grpc
+import httpx
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+_RETRYABLE_GRPC_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+}
+_RETRYABLE_HTTP_STATUSES = {429, 502, 503, 504}
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, grpc.aio.AioRpcError):
+        return error.code() in _RETRYABLE_GRPC_CODES
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in _RETRYABLE_HTTP_STATUSES
+    return isinstance(error, (httpx.TransportError, ResponseHandlingException, asyncio.TimeoutError))
+
+
+class PooledAsyncQdrantClient:
+    """
+    A round-robin pool of ``AsyncQdrantClient`` connections with retries
+
+    Each client owns its own gRPC channel (or HTTP connection pool), so a slow
+    call on one connection does not hold up the searches queued behind it.
+    Every coroutine method of ``AsyncQdrantClient`` is available on the pool
+    and is retried with jittered exponential backoff on transient failures:
+    unavailable or overloaded server, timeouts, dropped connections. Writes
+    here always carry explicit point ids, so retrying them is safe.
+    """
+
+    def __init__(self, size: int, retries: int, backoff: float, **client_kwargs: Any):
+        self._clients = [AsyncQdrantClient(**client_kwargs) for _ in range(max(size, 1))]
+        self._next = itertools.cycle(self._clients)
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {"calls": 0, "retries": 0, "failures": 0}
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._clients[0], name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._call(name, args, kwargs)
+
+        return call
+
+    async def _call(self, name: str, args: tuple, kwargs: dict) -> Any:
+        self.stats["calls"] += 1
+        for attempt in range(self.retries + 1):
+            method: Callable = getattr(next(self._next), name)
+            try:
+                return await method(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                delay = self.backoff * (2 ** attempt)
+                print(f"Qdrant {name} failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def close(self) -> None:
+        await asyncio.gather(*(client.close() for client in self._clients), return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "connections": len(self._clients)}
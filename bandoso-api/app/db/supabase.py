@@ -1,15 +1,36 @@
-from supabase import create_client
-from supabase.lib.client_options import ClientOptions
+from typing import Optional
+from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase.lib.client_options import ClientOptions, AsyncClientOptions
 from app.config import config
 
-# Initialize Supabase client using config
-supabase = create_client(
-    config.SUPABASE_HOST,
-    config.SUPABASE_SERVICE_KEY,
-    options=ClientOptions(
-        auto_refresh_token=False,
-        persist_session=False,
-    )
-)
-# Access auth admin api
-admin_auth_client = supabase.auth.admin
\ No newline at end of file
+# Both clients are created on first use, so importing this module has no side effects
+_supabase: Optional[Client] = None
+
+def get_supabase() -> Client:
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(
+            config.SUPABASE_HOST,
+            config.SUPABASE_SERVICE_KEY,
+            options=ClientOptions(
+                auto_refresh_token=False,
+                persist_session=False,
+            )
+        )
+    return _supabase
+
+# The async client can only be built inside a running event loop
+_async_supabase: Optional[AsyncClient] = None
+
+async def get_async_supabase() -> AsyncClient:
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = await acreate_client(
+            config.SUPABASE_HOST,
+            config.SUPABASE_SERVICE_KEY,
+            options=AsyncClientOptions(
+                auto_refresh_token=False,
+                persist_session=False,
+            )
+        )
+    return _async_supabase
\ No newline at end of file
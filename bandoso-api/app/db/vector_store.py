@@ -0,0 +1,122 @@
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, models
+
+
+class AsyncQdrantVectorStore(QdrantVectorStore):
+    """QdrantVectorStore whose async methods use an ``AsyncQdrantClient``.
+
+    ``QdrantVectorStore`` only knows the synchronous client, so every ``a*``
+    method it inherits runs the blocking call in a thread pool. The sync API
+    is kept as-is for the admin services; the chat path uses the async one.
+    """
+
+    def __init__(
+        self,
+        async_client: AsyncQdrantClient,
+        search_params: Optional[models.SearchParams] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.async_client = async_client
+        # HNSW ef and quantization rescoring, from the collection's profile
+        self.search_params = search_params
+
+    def _to_document(self, point: Any) -> Document:
+        return self._document_from_point(
+            point,
+            self.collection_name,
+            self.content_payload_key,
+            self.metadata_payload_key,
+        )
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        kwargs.setdefault("search_params", self.search_params)
+        response = await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=embedding,
+            using=self.vector_name,
+            query_filter=filter,
+            limit=k,
+            with_payload=True,
+            with_vectors=False,
+            score_threshold=score_threshold,
+            **kwargs,
+        )
+        return [(self._to_document(point), point.score) for point in response.points]
+
+    async def asimilarity_search_with_relevance_scores_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        relevance_score_fn = self._select_relevance_score_fn()
+        results = await self.asimilarity_search_with_score_by_vector(embedding, k, **kwargs)
+        return [(doc, relevance_score_fn(score)) for doc, score in results]
+
+    async def asimilarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        results = await self.asimilarity_search_with_score_by_vector(embedding, k, **kwargs)
+        return [doc for doc, _ in results]
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = await self.embeddings.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        results = await self.asimilarity_search_with_score(query, k, **kwargs)
+        return [doc for doc, _ in results]
+
+    async def aadd_embeddings(
+        self,
+        texts: Iterable[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        payloads = self._build_payloads(
+            texts, metadatas, self.content_payload_key, self.metadata_payload_key
+        )
+        points = [
+            models.PointStruct(id=point_id, vector={self.vector_name: vector}, payload=payload)
+            for point_id, vector, payload in zip(ids, embeddings, payloads)
+        ]
+        await self.async_client.upsert(
+            collection_name=self.collection_name, points=points, **kwargs
+        )
+        return ids
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = await self.embeddings.aembed_documents(texts)
+        return await self.aadd_embeddings(texts, embeddings, metadatas, ids, **kwargs)
+
+    async def adelete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        result = await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=ids,
+        )
+        return result.status == models.UpdateStatus.COMPLETED
@@ -1,14 +1,22 @@
+import hashlib
+import time
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
 from jose.exceptions import JWTError, ExpiredSignatureError
 from app.config import config
-from app.db.supabase import supabase
+from app.db.supabase import get_async_supabase
+from app.utils.cache import TTLCache
 
 # Create HTTPBearer instance
 security = HTTPBearer()
 
+# user_id -> role
+_role_cache = TTLCache(maxsize=config.AUTH_ROLE_CACHE_MAX_SIZE, ttl=config.AUTH_ROLE_CACHE_TTL_SECONDS)
+# sha256(token) -> decoded payload, each entry expiring with the token's exp
+_token_cache = TTLCache(maxsize=config.AUTH_TOKEN_CACHE_MAX_SIZE)
+
 class JWTVerificationError(Exception):
     """Custom exception for JWT verification errors"""
     pass
@@ -30,17 +38,39 @@ def verify_jwt_token(token: str) -> dict:
     Raises:
         JWTVerificationError: If token is invalid or expired
     """
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(token_hash)
+    if cached is not None:
+        # Callers add keys such as "role" to the payload, so never hand out the cached dict
+        return dict(cached)
+
     try:
         decoded = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM], options={"verify_aud": False})
-        return decoded
     except jwt.ExpiredSignatureError:
         raise JWTVerificationError("Token has expired")
     except jwt.JWTError as e:
         raise JWTVerificationError("Invalid token")
 
-def get_user_role(user_id: str) -> Optional[str]:
+    exp = decoded.get("exp")
+    if isinstance(exp, (int, float)) and exp > time.time():
+        _token_cache.set(token_hash, dict(decoded), ttl=exp - time.time())
+    return decoded
+
+def invalidate_user_role(user_id: str) -> None:
     """
-    Get user role from account_profiles table
+    Drop a user's cached role, after their profile changes or is deleted
+    
+    Args:
+        user_id: The user's account_id (UUID)
+    """
+    _role_cache.pop(user_id)
+
+def get_auth_cache_stats() -> dict:
+    return {"roles": _role_cache.stats(), "tokens": _token_cache.stats()}
+
+async def get_user_role(user_id: str) -> Optional[str]:
+    """
+    Get user role from account_profiles table, cached for a short TTL
     
     Args:
         user_id: The user's account_id (UUID)
@@ -48,11 +78,18 @@ def get_user_role(user_id: str) -> Optional[str]:
     Returns:
         str or None: The user's role or None if not found
     """
+    role = _role_cache.get(user_id)
+    if role is not None:
+        return role
+
     try:
-        response = supabase.table("account_profiles").select("role").eq("account_id", user_id).execute()
+        supabase = await get_async_supabase()
+        response = await supabase.table("account_profiles").select("role").eq("account_id", user_id).execute()
         
         if response.data and len(response.data) > 0:
-            return response.data[0]["role"]
+            role = response.data[0]["role"]
+            _role_cache.set(user_id, role)
+            return role
         return None
     except Exception as e:
         # Log error in production
@@ -117,7 +154,7 @@ async def get_current_user_with_role(
         dict: User information with role added
     """
     user_id = current_user.get("sub")
-    role = get_user_role(user_id)
+    role = await get_user_role(user_id)
     
     current_user["role"] = role
     return current_user
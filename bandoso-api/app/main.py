@@ -1,9 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import users, document, chat, visitor_logs
+from app.routers import users, document, chat, visitor_logs, metrics, area, health
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.request_counts import request_counts
+from app.services.visitor_logs import visitor_log_writer
+from app.services.side_effects import side_effects
+from app.services.health import init_qdrant, warmup, run_startup_step, mark_started, mark_stopping
+from app.core.checkpointer import checkpointer
+from app.core.query_cache import cache_maintainer
+from app.db.qdrant import close_clients
 from app.config import config
 
-app = FastAPI(title="BanDoSo - API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing connects at import time; a Qdrant outage here leaves the app up but not ready
+    await run_startup_step("qdrant", init_qdrant)
+    await run_startup_step("checkpointer", checkpointer.start, required=True)
+    if config.STARTUP_WARMUP:
+        await run_startup_step("warmup", warmup)
+    await ingestion_jobs.start()
+    await request_counts.start()
+    await visitor_log_writer.start()
+    await cache_maintainer.start()
+    await side_effects.start()
+    mark_started()
+    yield
+    mark_stopping()
+    # Drain first: queued side effects write through request_counts and the cache
+    await side_effects.stop()
+    await ingestion_jobs.stop()
+    await request_counts.stop()
+    await visitor_log_writer.stop()
+    await cache_maintainer.stop()
+    await checkpointer.stop()
+    await close_clients()
+
+app = FastAPI(title="BanDoSo - API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,4 +49,7 @@ app.add_middleware(
 app.include_router(users.router)
 app.include_router(chat.router)
 app.include_router(document.router)
-app.include_router(visitor_logs.router)
\ No newline at end of file
+app.include_router(visitor_logs.router)
+app.include_router(metrics.router)
+app.include_router(area.router)
+app.include_router(health.router)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from supabase_auth import BaseModel
+from pydantic import Field
 from typing import Optional
 from app.models.base import QueryBase
 from langchain_core.documents import Document
@@ -8,7 +9,7 @@ class AskRequest(BaseModel):
     question: str = ""
     context: Optional[str] = ""
     metadata: Optional[dict] = {}
-    thread_id: str = str(uuid.uuid4())
+    thread_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     area_id: Optional[str] = ""
     
 class GetChatCacheRequest(BaseModel):
@@ -24,4 +25,44 @@ class DeleteChatCacheRequest(BaseModel):
     uuids: list[str]
     
 class DeleteChatCacheResponse(BaseModel):
-    status: bool
\ No newline at end of file
+    status: bool
+
+class SearchChatCacheRequest(BaseModel):
+    question: str
+    area_id: Optional[str] = ""
+    k: int = Field(default=5, ge=1, le=50)
+
+class ChatCacheMatch(BaseModel):
+    id: str
+    question: str
+    answer: str
+    score: float
+    area_id: Optional[str] = None
+    hit_count: int = 0
+
+class SearchChatCacheResponse(BaseModel):
+    threshold: float
+    matches: list[ChatCacheMatch]
+
+class CacheReplayRequest(BaseModel):
+    top_n: int = Field(default=100, ge=1, le=10000)
+    area_id: Optional[str] = ""
+
+class CacheWarmupJob(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    total: int
+    done: int
+    inserted: int
+    deduplicated: int
+    skipped: int
+    failed: int
+    hit_rate_before: Optional[float] = None
+    hit_rate_after: Optional[float] = None
+    error: Optional[str] = None
+    started_at: float
+    finished_at: Optional[float] = None
+
+class ListCacheWarmupJobResponse(BaseModel):
+    jobs: list[CacheWarmupJob]
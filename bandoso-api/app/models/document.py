@@ -12,7 +12,26 @@ class AddDocumentFileRequest(BaseModel):
     metadata: dict
 
 class AddDocumentFileResponse(BaseModel):
-    ids: Optional[list[str]] 
+    ids: Optional[list[str]] = None
+    job_id: Optional[str] = None
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    file_url: str
+    metadata: dict
+    pages_processed: int
+    chunks_processed: int
+    chunks_per_second: float
+    attempts: int
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    ids: Optional[list[str]] = None
+
+class ListIngestionJobResponse(BaseModel):
+    jobs: list[IngestionJobResponse]
 
 class AddDocumentResponse(BaseModel):
     ids: Optional[list[str]] 
@@ -35,6 +54,8 @@ class UpdateDocumentResponse(BaseModel):
 
 class DeleteDocumentRequest(BaseModel):
     ids: Optional[list[str]] = []
+    # Deletes every chunk whose metadata.document_id is listed, e.g. those of an uploaded file
+    document_ids: Optional[list[str]] = []
 
 
 class DeleteDocumentResponse(BaseModel):
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+from app.services.area import invalidate_area_config
+from app.dependencies.auth import get_admin_user
+
+router = APIRouter(prefix="/areas", tags=["areas"], dependencies=[Depends(get_admin_user)])
+
+# Area limits are edited outside this API; call these after a change to skip the cache TTL
+@router.post("/cache/invalidate")
+async def invalidate_all_area_configs():
+    invalidate_area_config()
+    return {"message": "Area cache cleared."}
+
+@router.post("/{area_id}/cache/invalidate")
+async def invalidate_one_area_config(area_id: str):
+    invalidate_area_config(area_id)
+    return {"message": "Area cache cleared."}
@@ -1,46 +1,96 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request
 from app.dependencies.auth import get_admin_user
-from app.core.query_cache import find_in_cache
+from app.core.query_cache import find_in_exact_cache, find_in_semantic_cache
+from app.core.embedding import embeddings
 from app.services.area import *
 import uuid
 from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
-from langchain_core.messages import AIMessageChunk
 import json
 from app.models.chat import *
 from app.services.chat import *
+from app.services.cache_warmup import (
+    FAQ_FORMATS, parse_faq, import_faq, replay_questions, start_job, warmup_jobs, public_progress
+)
 
-from app.core.rag import graph
+from app.services.chat_stream import SSE_HEADERS, ask_events, answer_events, record_question, sse_stream, text_stream
 from app.services.area import *
 
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 @router.post("/ask")
-async def ask(request: AskRequest):
-    cached_answer = find_in_cache(request.question)
+async def ask(request: AskRequest, http_request: Request):
+    # SSE clients get the accepted event before any lookup runs
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return StreamingResponse(
+            sse_stream(ask_events(http_request, request)), media_type="text/event-stream", headers=SSE_HEADERS
+        )
+
+    await record_question(request)
+    cached_answer = find_in_exact_cache(request.question, request.area_id)
     if cached_answer is not None: 
         return StreamingResponse(iter([cached_answer]), media_type="text/plain")
 
-    is_reach_limit = has_remaining_quota_for_area(request.area_id)
+    question_embedding = await embeddings.aembed_query(request.question)
+    cached_answer = await find_in_semantic_cache(request.question, question_embedding, request.area_id)
+    if cached_answer is not None: 
+        return StreamingResponse(iter([cached_answer]), media_type="text/plain")
+
+    is_reach_limit = await has_remaining_quota_for_area(request.area_id)
     if is_reach_limit:
         return StreamingResponse(iter([config.LIMIT_REACH_MESSAGE]), media_type="text/plain")
     
-    async def event_stream():
-        state = {"question": request.question, "context": request.context, "metadata": request.metadata, "area_id": request.area_id}
-        for chunk, step in graph.stream(state, stream_mode="messages", config={
-             "configurable": {"thread_id": request.thread_id}
-        }):
-            if isinstance(chunk, AIMessageChunk):
-                yield chunk.content
-
-    return StreamingResponse(event_stream(), media_type="text/plain")
+    state = {
+        "question": request.question,
+        "context": request.context,
+        "metadata": request.metadata,
+        "area_id": request.area_id,
+        "question_embedding": question_embedding,
+    }
+    return StreamingResponse(
+        text_stream(answer_events(http_request, state, request.thread_id)), media_type="text/plain"
+    )
 
 @router.post("/cache", response_model=GetChatCacheResponse)
-def get_cache(request: GetChatCacheRequest):
-    return get_chat_cache(request)
+async def get_cache(request: GetChatCacheRequest):
+    return await get_chat_cache(request)
+
+@router.post("/cache/search", response_model=SearchChatCacheResponse, dependencies=[Depends(get_admin_user)])
+async def search_cache(request: SearchChatCacheRequest):
+    return await search_chat_cache(request)
+
+# Warm-up runs in the background; poll /chats/cache/warmup/{job_id} for progress and hit rates
+@router.post("/cache/import", response_model=CacheWarmupJob, dependencies=[Depends(get_admin_user)])
+async def import_cache(file: UploadFile = File(...), area_id: Optional[str] = Form(None), format: Optional[str] = Form(None)):
+    format = (format or (file.filename or "").rsplit(".", 1)[-1]).lower()
+    if format not in FAQ_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format; expected one of {', '.join(FAQ_FORMATS)}.")
+    try:
+        pairs = parse_faq((await file.read()).decode("utf-8-sig"), format)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {format} file: {e}")
+    progress = start_job("import", lambda progress: import_faq(pairs, progress, area_id or None))
+    return public_progress(progress)
+
+@router.post("/cache/replay", response_model=CacheWarmupJob, dependencies=[Depends(get_admin_user)])
+async def replay_cache(request: CacheReplayRequest):
+    # The top questions come from the question log, which counts asks since it was enabled
+    progress = start_job("replay", lambda progress: replay_questions(request.top_n, progress, request.area_id or None))
+    return public_progress(progress)
+
+@router.get("/cache/warmup", response_model=ListCacheWarmupJobResponse, dependencies=[Depends(get_admin_user)])
+async def list_cache_warmups():
+    return ListCacheWarmupJobResponse(jobs=[public_progress(progress) for progress in reversed(warmup_jobs.values())])
+
+@router.get("/cache/warmup/{job_id}", response_model=CacheWarmupJob, dependencies=[Depends(get_admin_user)])
+async def get_cache_warmup(job_id: str):
+    progress = warmup_jobs.get(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return public_progress(progress)
 
 @router.delete("/cache", response_model=DeleteChatCacheResponse, dependencies=[Depends(get_admin_user)])
-def get_cache(request: DeleteChatCacheRequest):
-    return delete_chat_cache(request)
+async def get_cache(request: DeleteChatCacheRequest):
+    return await delete_chat_cache(request)
 
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from langchain_core.documents import Document
 from app.models.document import *
 from app.services.document import *
-from app.db.qdrant import doc_vector_store
+from app.services.ingestion_jobs import ingestion_jobs
 from app.dependencies.auth import get_admin_user
 import uuid
 
@@ -11,29 +11,57 @@ from app.models.document import *
 # Create (Add Document)
 @router.post("/", response_model=AddDocumentResponse, dependencies=[Depends(get_admin_user)])
 async def create_document(request: AddDocumentRequest):
-    doc_ids = add_document(request)
+    doc_ids = await add_document(request)
     return AddDocumentResponse(ids=doc_ids)
 
 @router.post("/file", response_model=AddDocumentFileResponse, dependencies=[Depends(get_admin_user)])
 async def create_document_from_file(request: AddDocumentFileRequest):
-    doc_ids = add_document_from_file(request)
-    return AddDocumentFileResponse(ids=doc_ids)
+    # Ingestion runs in the background; poll /documents/jobs/{job_id} for progress and chunk ids
+    job_id = await ingestion_jobs.submit(request.file_url, request.metadata)
+    return AddDocumentFileResponse(job_id=job_id)
+
+@router.get("/jobs", response_model=ListIngestionJobResponse, dependencies=[Depends(get_admin_user)])
+async def list_ingestion_jobs(limit: int = 50, status: Optional[str] = None):
+    return ListIngestionJobResponse(jobs=await ingestion_jobs.list_jobs(limit, status))
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse, dependencies=[Depends(get_admin_user)])
+async def get_ingestion_job(job_id: str):
+    job = await ingestion_jobs.get(job_id, with_ids=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobResponse, dependencies=[Depends(get_admin_user)])
+async def cancel_ingestion_job(job_id: str):
+    job = await ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@router.post("/jobs/{job_id}/retry", response_model=IngestionJobResponse, dependencies=[Depends(get_admin_user)])
+async def retry_ingestion_job(job_id: str):
+    job = await ingestion_jobs.retry(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
 
 
 # Read (Get Documents)
 @router.post("/query", response_model=GetDocumentResponse, dependencies=[Depends(get_admin_user)])
 async def get_documents(request: GetDocumentRequest):
-    return get_document(request)
+    return await get_document(request)
 
 # Update (Update Document)
 @router.put("/update", response_model=UpdateDocumentResponse, dependencies=[Depends(get_admin_user)])
 async def update_document_route(request: UpdateDocumentRequest):
-    return update_document(request)
+    return await update_document(request)
 
 # Delete (Delete Document)
 @router.delete("/delete", response_model=DeleteDocumentResponse, dependencies=[Depends(get_admin_user)])
 async def delete_document_route(request:DeleteDocumentRequest):
-    result = delete_document(request)
+    # An ingestion still running would store chunks again after the delete
+    await ingestion_jobs.cancel_documents(request.document_ids or [])
+    result = await delete_document(request)
     if not result:
         raise HTTPException(status_code=404, detail="Document not found.")
     return DeleteDocumentResponse(status=result)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.health import check_liveness, check_readiness
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+# Liveness only says the process is serving; readiness also checks Qdrant, Supabase and the checkpointer
+@router.get("/live")
+async def live():
+    return check_liveness()
+
+@router.get("/ready")
+async def ready():
+    is_ready, report = await check_readiness()
+    return JSONResponse(report, status_code=200 if is_ready else 503)
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends
+from app.dependencies.auth import get_admin_user, get_auth_cache_stats
+from app.core.query_cache import get_cache_stats
+from app.core.embedding import embeddings
+from app.services.request_counts import request_counts
+from app.services.area import get_area_cache_stats
+from app.services.visitor_logs import visitor_log_writer
+from app.services.side_effects import side_effects
+from app.services.question_log import question_log
+from app.services.chat_stream import get_stream_stats
+from app.core.checkpointer import checkpointer
+from app.core.rag import compaction_stats
+from app.core.routing import get_routing_stats
+from app.db.indexes import get_index_status
+from app.db.qdrant import get_async_client
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(get_admin_user)])
+
+@router.get("/query-cache")
+async def query_cache_metrics():
+    return get_cache_stats()
+
+@router.get("/embedding-cache")
+async def embedding_cache_metrics():
+    return embeddings.get_stats()
+
+@router.get("/request-counts")
+async def request_count_metrics():
+    return request_counts.get_stats()
+
+@router.get("/area-cache")
+async def area_cache_metrics():
+    return get_area_cache_stats()
+
+@router.get("/auth-cache")
+async def auth_cache_metrics():
+    return get_auth_cache_stats()
+
+@router.get("/visitor-logs")
+async def visitor_log_metrics():
+    return visitor_log_writer.get_stats()
+
+@router.get("/checkpoints")
+async def checkpoint_metrics():
+    return {**checkpointer.get_stats(), "compaction": compaction_stats}
+
+@router.get("/routing")
+async def routing_metrics():
+    return get_routing_stats()
+
+@router.get("/payload-indexes")
+async def payload_index_metrics():
+    return await get_index_status()
+
+@router.get("/qdrant")
+async def qdrant_metrics():
+    return get_async_client().get_stats()
+
+@router.get("/side-effects")
+async def side_effect_metrics():
+    return side_effects.get_stats()
+
+@router.get("/question-log")
+async def question_log_metrics():
+    return question_log.get_stats()
+
+@router.get("/chat-streams")
+async def chat_stream_metrics():
+    return get_stream_stats()
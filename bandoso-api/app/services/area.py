@@ -1,10 +1,22 @@
-from app.db.supabase import supabase
+from app.db.supabase import get_async_supabase
+from app.services.request_counts import request_counts
+from app.utils.cache import TTLCache
 from app.config import config
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 import math
 
-def get_area_limit(area_id: str):
-    response = (
+PERIOD_DAYS = 30
+
+# area_id -> {"limit", "created_at", "period_start", "period_end"}; unknown ids are cached as _NOT_FOUND
+_area_configs = TTLCache(maxsize=config.AREA_CACHE_MAX_SIZE, ttl=config.AREA_CACHE_TTL_SECONDS)
+_NOT_FOUND = object()
+# hotspot_id -> area_id, used to tag chunks with their area at ingestion
+_hotspot_areas = TTLCache(maxsize=config.AREA_CACHE_MAX_SIZE, ttl=config.AREA_CACHE_TTL_SECONDS)
+
+async def _fetch_area_limit(area_id: str):
+    supabase = await get_async_supabase()
+    response = await (
         supabase.table("areas")
         .select("chatbot_limit_request, created_at")
         .eq("area_id", area_id)
@@ -18,61 +30,136 @@ def get_area_limit(area_id: str):
     else:
         return None, None
 
+async def get_area_config(area_id: str) -> Optional[dict]:
+    """
+    Get the chatbot limit and current billing period of an area, cached with a TTL
+
+    The period start and the instant the next period begins are computed once,
+    and only recomputed when that boundary has passed.
+
+    Args:
+        area_id: The area's id
+
+    Returns:
+        dict or None: The area configuration or None if the area does not exist
+    """
+    entry = _area_configs.get(area_id)
+    if entry is _NOT_FOUND:
+        return None
+
+    if entry is None:
+        limit, created_at = await _fetch_area_limit(area_id)
+        if not created_at:
+            _area_configs.set(area_id, _NOT_FOUND, ttl=config.AREA_CACHE_NEGATIVE_TTL_SECONDS)
+            return None
+        entry = {"limit": limit, "created_at": created_at, "period_start": None, "period_end": None}
+        _area_configs.set(area_id, entry)
+
+    if entry["period_end"] is None or datetime.now(timezone.utc) >= entry["period_end"]:
+        entry["period_start"] = get_current_period_start(entry["created_at"])
+        entry["period_end"] = entry["period_start"] + timedelta(days=PERIOD_DAYS)
+    return entry
+
+def invalidate_area_config(area_id: Optional[str] = None):
+    """
+    Drop cached area configuration, for one area or for all of them
+    """
+    if area_id is None:
+        _area_configs.clear()
+    else:
+        _area_configs.pop(area_id)
+
+def get_area_cache_stats() -> dict:
+    return _area_configs.stats()
+
+async def get_area_limit(area_id: str):
+    area = await get_area_config(area_id)
+    if area is None:
+        return None, None
+    return area["limit"], area["created_at"]
+
 def get_current_period_start(created_at: datetime) -> datetime:
     now = datetime.now(timezone.utc)
     days_since_created = (now - created_at).days
-    periods_since_created = math.floor(days_since_created / 30)
-    return created_at + timedelta(days=30 * periods_since_created)
-
-def has_remaining_quota_for_area(area_id: str) -> bool:
-    limit, created_at = get_area_limit(area_id)
+    periods_since_created = math.floor(days_since_created / PERIOD_DAYS)
+    return created_at + timedelta(days=PERIOD_DAYS * periods_since_created)
 
-    if not limit or not created_at:
-        raise Exception("Area not found or missing data")
-
-    period_start = get_current_period_start(created_at)
+async def _get_period_count(area_id: str, period_start: str) -> int:
+    count = request_counts.known_count(area_id, period_start)
+    if count is not None:
+        return count
 
-    res = (
+    supabase = await get_async_supabase()
+    res = await (
         supabase.table("chatbot_request_counts")
         .select("request_count")
         .eq("area_id", area_id)
-        .eq("period_start", period_start.isoformat())
+        .eq("period_start", period_start)
         .execute()
     )
 
     if res.data and len(res.data) > 0:
-        current_count = res.data[0]["request_count"]
+        count = res.data[0]["request_count"]
     else:
-        current_count = 0
+        count = 0
+    request_counts.set_known_count(area_id, period_start, count)
+    return count
 
-    return current_count > limit
+async def has_remaining_quota_for_area(area_id: str) -> bool:
+    area = await get_area_config(area_id)
+
+    if area is None or not area["limit"]:
+        raise Exception("Area not found or missing data")
 
-def increment_area_request_count(area_id: str):
-    limit, created_at = get_area_limit(area_id)
+    period_start = area["period_start"].isoformat()
+    # Increments still buffered locally count against the quota too
+    current_count = await _get_period_count(area_id, period_start) + request_counts.unflushed(area_id, period_start)
 
-    if not created_at:
+    return current_count > area["limit"]
+
+async def increment_area_request_count(area_id: str):
+    area = await get_area_config(area_id)
+
+    if area is None:
         raise Exception("Area not found or missing created_at")
 
-    period_start = get_current_period_start(created_at)
+    # Buffered and applied later as one atomic increment per (area, period)
+    await request_counts.increment(area_id, area["period_start"].isoformat())
 
-    # Fetch current count
-    res = (
-        supabase.table("chatbot_request_counts")
-        .select("request_count")
-        .eq("area_id", area_id)
-        .eq("period_start", period_start.isoformat())
+async def get_hotspot_area_id(hotspot_id) -> Optional[str]:
+    area_id = _hotspot_areas.get(str(hotspot_id))
+    if area_id is not None:
+        return area_id
+
+    supabase = await get_async_supabase()
+    response = await (
+        supabase.table("hotspots")
+        .select("area_id")
+        .eq("hotspot_id", hotspot_id)
         .execute()
     )
+    if not response.data or response.data[0].get("area_id") is None:
+        return None
+    area_id = str(response.data[0]["area_id"])
+    _hotspot_areas.set(str(hotspot_id), area_id)
+    return area_id
 
-    if res.data and len(res.data) > 0:
-        current_count = res.data[0]["request_count"]
-        # Update with incremented value
-        supabase.table("chatbot_request_counts").update({
-            "request_count": current_count + 1
-        }).eq("area_id", area_id).eq("period_start", period_start.isoformat()).execute()
-    else:
-        supabase.table("chatbot_request_counts").insert({
-            "area_id": area_id,
-            "period_start": period_start.isoformat(),
-            "request_count": 1
-        }).execute()
+async def resolve_document_area_id(metadata: dict) -> Optional[str]:
+    """
+    Find the area a document belongs to, for the area_id tenant key of its chunks
+
+    Args:
+        metadata: The document metadata, with an area_id or a hotspot_id
+
+    Returns:
+        str or None: The area id, SHARED_AREA_ID for documents not tied to a
+        hotspot, or None when the hotspot does not exist
+    """
+    if metadata.get("area_id"):
+        return str(metadata["area_id"])
+    if metadata.get("hotspot_id") is None:
+        return config.SHARED_AREA_ID
+    area_id = await get_hotspot_area_id(metadata["hotspot_id"])
+    if area_id is None:
+        print(f"Warning: hotspot {metadata['hotspot_id']} has no area; its chunks will only match unscoped searches")
+    return area_id
@@ -1,18 +1,19 @@
-from app.db.qdrant import client
-from app.db.qdrant import doc_vector_store
 from app.models.document import *
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from qdrant_client import models
+from app.db.indexes import check_indexed
 
 
-def  query_builder(queries: list[QueryBase]) -> models.Filter:
+def  query_builder(queries: list[QueryBase], collection_name: str = None) -> models.Filter:
     q = []
     for query in queries:
         q.append(models.FieldCondition(
             key=f"metadata.{query.key}",
             match=models.MatchValue(value=query.value)
         ))
+    if collection_name:
+        check_indexed(collection_name, [condition.key for condition in q])
 
     return models.Filter(
         must=q
@@ -0,0 +1,243 @@
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from app.config import config
+from app.core.checkpointer import checkpointer
+from app.core.embedding import embeddings
+from app.core.query_cache import add_to_cache, search_semantic_cache, similarity_threshold
+from app.core.rag import get_graph
+from app.services.question_log import question_log
+from app.services.side_effects import side_effects
+
+FAQ_FORMATS = ("csv", "jsonl")
+
+# job_id -> progress of an import or replay started from the API, newest last
+warmup_jobs: dict[str, dict] = {}
+
+
+def new_progress(kind: str, job_id: Optional[str] = None) -> dict:
+    return {
+        "job_id": job_id or str(uuid.uuid4()),
+        "kind": kind,
+        "status": "running",
+        "total": 0,
+        "done": 0,
+        "inserted": 0,
+        "deduplicated": 0,
+        "skipped": 0,
+        "failed": 0,
+        "hit_rate_before": None,
+        "hit_rate_after": None,
+        "error": None,
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+
+
+# FAQ import
+
+def parse_faq(content: str, format: str) -> list[dict]:
+    """
+    Read curated Q&A pairs
+
+    Every row needs a question and an answer; area_id is optional and any other
+    column or key is kept as cache metadata.
+
+    Args:
+        content: The file content
+        format: "csv" (with a header row) or "jsonl" (one object per line)
+
+    Returns:
+        list[dict]: {"question", "answer", "area_id", "metadata"} per valid row
+    """
+    if format == "csv":
+        try:
+            rows = list(csv.DictReader(io.StringIO(content)))
+        except csv.Error as e:
+            raise ValueError(str(e))
+    elif format == "jsonl":
+        rows = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        raise ValueError(f"Unknown FAQ format {format}; expected one of {', '.join(FAQ_FORMATS)}")
+
+    pairs = []
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError(f"Expected an object per line, got {row!r}")
+        question = str(row.pop("question", "") or "").strip()
+        answer = str(row.pop("answer", "") or "").strip()
+        if not question or not answer:
+            continue
+        area_id = str(row.pop("area_id", "") or "").strip() or None
+        pairs.append({"question": question, "answer": answer, "area_id": area_id, "metadata": row})
+    return pairs
+
+
+async def import_faq(pairs: list[dict], progress: dict, area_id: Optional[str] = None,
+                     batch_size: int = config.QUERY_CACHE_WARMUP_BATCH_SIZE) -> dict:
+    """
+    Load Q&A pairs into the semantic cache, embedding them in batches
+
+    Near-identical questions already cached for the same area, including
+    earlier rows of the same file, get the curated answer instead of a second
+    entry. Rows are therefore inserted one at a time; only embedding is batched.
+
+    Args:
+        pairs: Output of parse_faq
+        progress: Updated in place as batches complete
+        area_id: Area of the rows that have none
+
+    Returns:
+        dict: The final progress
+    """
+    progress["total"] = len(pairs)
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        vectors = await embeddings.aembed_documents([pair["question"] for pair in batch])
+        for pair, vector in zip(batch, vectors):
+            try:
+                inserted = await add_to_cache(
+                    pair["question"],
+                    pair["answer"],
+                    {**pair["metadata"], "area_id": pair["area_id"] or area_id, "source": "faq"},
+                    embedding=vector,
+                )
+                progress["inserted" if inserted else "deduplicated"] += 1
+            except Exception as e:
+                progress["failed"] += 1
+                print(f"Error importing a cached answer: {e}")
+            progress["done"] += 1
+    return progress
+
+
+# Replay of historical questions
+
+async def historical_questions(area_id: Optional[str] = None) -> tuple[Counter, dict]:
+    """
+    How often each question was asked, per area, as counted by the question log
+
+    Returns:
+        tuple[Counter, dict]: Counts keyed by (area_id, normalized question), and
+            the first wording seen for each key
+    """
+    return await question_log.counts(area_id)
+
+
+async def _is_cached(question: str, area_id: Optional[str], embedding=None) -> bool:
+    if embedding is None:
+        embedding = await embeddings.aembed_query(question)
+    results = await search_semantic_cache(embedding, area_id)
+    return bool(results) and results[0][1] >= similarity_threshold(area_id)
+
+
+async def hit_rate(counts: Counter, texts: dict, keys: list) -> float:
+    """Share of the asks of these questions, weighted by how often each was asked, that the cache answers."""
+    total = sum(counts[key] for key in keys)
+    if not total:
+        return 0.0
+    vectors = await embeddings.aembed_documents([texts[key] for key in keys])
+    hits = 0
+    for key, vector in zip(keys, vectors):
+        if await _is_cached(texts[key], key[0], vector):
+            hits += counts[key]
+    return round(hits / total, 4)
+
+
+async def replay_questions(top_n: int, progress: dict, area_id: Optional[str] = None,
+                           concurrency: int = config.QUERY_CACHE_WARMUP_CONCURRENCY) -> dict:
+    """
+    Answer the most asked questions that the cache misses, through the full pipeline
+
+    Runs use throwaway threads and do not count against the area's quota.
+    The hit rates are measured over the asks of the replayed questions,
+    before and after the replay.
+
+    Args:
+        top_n: How many of the most frequent questions to replay
+        progress: Updated in place as questions complete
+        area_id: Only replay this area's questions
+
+    Returns:
+        dict: The final progress
+    """
+    counts, texts = await historical_questions(area_id)
+    questions = [key for key, _ in counts.most_common(top_n)]
+    progress["total"] = len(questions)
+    progress["hit_rate_before"] = await hit_rate(counts, texts, questions)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def replay(question_area_id: Optional[str], question: str):
+        async with semaphore:
+            try:
+                embedding = await embeddings.aembed_query(question)
+                if await _is_cached(question, question_area_id, embedding):
+                    progress["skipped"] += 1
+                    return
+                thread_id = f"warmup-{uuid.uuid4()}"
+                try:
+                    result = await get_graph().ainvoke({
+                        "question": question,
+                        "context": "",
+                        "metadata": {"source": "replay"},
+                        "area_id": question_area_id,
+                        "question_embedding": embedding,
+                        "warmup": True,
+                    }, config={"configurable": {"thread_id": thread_id}})
+                finally:
+                    await checkpointer.adelete_thread(thread_id)
+                # Questions the model answers without the documents are not cached
+                progress["inserted" if result.get("response") else "skipped"] += 1
+            except Exception as e:
+                progress["failed"] += 1
+                print(f"Error replaying a question: {e}")
+            finally:
+                progress["done"] += 1
+
+    await asyncio.gather(*(replay(key[0], texts[key]) for key in questions))
+    # The answers are cached by the side-effect executor
+    await side_effects.drain()
+    progress["hit_rate_after"] = await hit_rate(counts, texts, questions)
+    return progress
+
+
+# Background jobs for the API
+
+def start_job(kind: str, run) -> dict:
+    """
+    Run an import or replay in the background
+
+    Args:
+        kind: "import" or "replay"
+        run: Called with the progress dict, returns the coroutine to run
+
+    Returns:
+        dict: The progress, updated in place while the job runs
+    """
+    progress = new_progress(kind)
+    warmup_jobs[progress["job_id"]] = progress
+    while len(warmup_jobs) > config.QUERY_CACHE_WARMUP_MAX_JOBS:
+        warmup_jobs.pop(next(iter(warmup_jobs)))
+
+    async def runner():
+        try:
+            await run(progress)
+            progress["status"] = "succeeded"
+        except Exception as e:
+            progress["status"] = "failed"
+            progress["error"] = str(e)
+            print(f"Error in cache warm-up job {progress['job_id']}: {e}")
+        finally:
+            progress["finished_at"] = time.time()
+
+    progress["_task"] = asyncio.create_task(runner())
+    return progress
+
+
+def public_progress(progress: dict) -> dict:
+    return {key: value for key, value in progress.items() if not key.startswith("_")}
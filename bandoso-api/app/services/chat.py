@@ -1,16 +1,18 @@
 from app.services.base import query_builder
-from app.db.qdrant import client
-from app.db.qdrant import cache_vector_store
+from app.db.qdrant import get_cache_vector_store
+from app.core.query_cache import search_semantic_cache, similarity_threshold, forget_points
+from app.core.embedding import embeddings
 from app.models.chat import *
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from qdrant_client import models
 
 
-def get_chat_cache(request: GetChatCacheRequest):
-    records, point_id = cache_vector_store.client.scroll(
+async def get_chat_cache(request: GetChatCacheRequest):
+    cache_vector_store = get_cache_vector_store()
+    records, point_id = await cache_vector_store.async_client.scroll(
         collection_name=cache_vector_store.collection_name,
-        scroll_filter=query_builder(request.queries),
+        scroll_filter=query_builder(request.queries, cache_vector_store.collection_name),
         limit=request.limit,
         with_vectors=False, 
         with_payload=True,
@@ -25,8 +27,33 @@ def get_chat_cache(request: GetChatCacheRequest):
         ))
     return GetChatCacheResponse(questions=documents, next_offset_id=point_id if point_id else "")
 
-def delete_chat_cache(request: DeleteChatCacheRequest):
-    is_deleted = cache_vector_store.delete(
+async def delete_chat_cache(request: DeleteChatCacheRequest):
+    is_deleted = await get_cache_vector_store().adelete(
         ids=request.uuids
     )
-    return DeleteChatCacheResponse(status=is_deleted)
\ No newline at end of file
+    # Other workers drop their copies at their next compaction
+    forget_points(request.uuids)
+    return DeleteChatCacheResponse(status=is_deleted)
+
+async def search_chat_cache(request: SearchChatCacheRequest):
+    """
+    The closest cached questions of an area with their scores, to tune its threshold
+
+    A match hits the cache when its score reaches the threshold.
+    """
+    embedding = await embeddings.aembed_query(request.question)
+    results = await search_semantic_cache(embedding, request.area_id, k=request.k)
+    return SearchChatCacheResponse(
+        threshold=similarity_threshold(request.area_id),
+        matches=[
+            ChatCacheMatch(
+                id=str(doc.metadata["_id"]),
+                question=doc.page_content,
+                answer=doc.metadata.get("answer", ""),
+                score=score,
+                area_id=doc.metadata.get("area_id"),
+                hit_count=doc.metadata.get("hit_count", 0),
+            )
+            for doc, score in results
+        ],
+    )
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import time
+import uuid
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from app.config import config
+from app.core.embedding import embeddings
+from app.core.query_cache import find_in_exact_cache, find_in_semantic_cache
+from app.core.rag import get_graph
+from app.models.chat import AskRequest
+from app.services.area import has_remaining_quota_for_area
+from app.services.question_log import question_log
+from app.services.side_effects import side_effects
+from app.services.single_flight import answer_flights
+from app.utils.text import question_key
+
+# Nodes whose model output is the answer; the tool-calling decision streams nothing else
+ANSWER_NODES = {"generate_query_or_respond", "generate_answer"}
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx from buffering the stream, which would delay the first byte
+    "X-Accel-Buffering": "no",
+}
+
+stream_stats = {
+    "streams": 0,
+    "completed": 0,
+    "abandoned": 0,
+    "errors": 0,
+    # Streams that joined another visitor's run instead of starting their own
+    "coalesced": 0,
+    "tokens_streamed": 0,
+    "tokens_saved_estimate": 0,
+}
+# Output size of completed answers, to estimate what an abandoned one would have cost
+_answers = {"count": 0, "tokens": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def event(name: str, **data) -> dict:
+    return {"event": name, "data": data}
+
+
+async def graph_events(state: dict, thread_id: str) -> AsyncIterator[dict]:
+    """The status and token events of one run of the RAG graph."""
+    yield event("status", stage="routing")
+    async for mode, payload in get_graph().astream(state, stream_mode=["messages", "updates"], config={
+        "configurable": {"thread_id": thread_id}
+    }):
+        if mode == "messages":
+            chunk, metadata = payload
+            # Helper model calls inside an answer node (the router) are tagged nostream
+            if TAG_NOSTREAM in (metadata.get("tags") or ()):
+                continue
+            if (isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content
+                    and metadata.get("langgraph_node") in ANSWER_NODES):
+                yield event("token", text=chunk.content)
+            continue
+        for node, update in (payload or {}).items():
+            if node == "generate_query_or_respond" and update and update["messages"][-1].tool_calls:
+                yield event("status", stage="retrieving")
+            elif node == "retrieve":
+                yield event("status", stage="generating")
+
+
+def flight_key(state: dict) -> Optional[tuple]:
+    """Requests with the same normalized question, area and context get the same answer."""
+    if not config.CHAT_STREAM_COALESCE:
+        return None
+    return (*question_key(state["question"], state.get("area_id")), state.get("context") or "")
+
+
+def exchange_messages(state: dict, answer: str) -> list:
+    # Fixed ids make a retried write replace the messages instead of appending them again
+    return [
+        HumanMessage(content=state["question"], id=str(uuid.uuid4())),
+        AIMessage(content=answer, id=str(uuid.uuid4())),
+    ]
+
+
+async def record_exchange(state: dict, thread_id: str, answer: str, messages: list) -> None:
+    """Add a question answered by another visitor's run to this visitor's conversation."""
+    # Written as the last node, so the thread is compacted on its next run rather than left pending
+    await get_graph().aupdate_state({"configurable": {"thread_id": thread_id}}, {
+        "messages": messages,
+        "question": state["question"],
+        "response": answer,
+        "area_id": state.get("area_id"),
+    }, as_node="compact_conversation")
+
+
+async def record_question(ask: AskRequest) -> None:
+    """Count a visitor's question for the cache warm-up, whether or not the cache answers it."""
+    await side_effects.submit("question_log", lambda: question_log.record(ask.question, ask.area_id))
+
+
+async def answer_events(request: Request, state: dict, thread_id: str) -> AsyncIterator[dict]:
+    """
+    Run the graph in a task and relay its events, ending with done or error
+
+    Concurrent requests with the same flight_key share one run: the first
+    starts it under its own thread, the others receive its events from the
+    start and get the exchange written to their own thread afterwards.
+
+    The visitor's connection is checked whenever the graph is quiet, and a
+    heartbeat is emitted after CHAT_STREAM_HEARTBEAT_SECONDS without events.
+    If the visitor leaves, or the consumer stops iterating, it stops
+    listening; once every visitor of the run has left, the graph task is
+    cancelled, which cancels the in-flight model call or document search.
+    """
+    async def produce():
+        try:
+            async for item in graph_events(state, thread_id):
+                yield item
+        except Exception as e:
+            print(f"Error streaming an answer: {e}")
+            yield event("error", message="The answer could not be generated.")
+
+    flight, queue, leader = answer_flights.join(flight_key(state), produce)
+    stream_stats["streams"] += 1
+    if not leader:
+        stream_stats["coalesced"] += 1
+    parts = []
+    tokens = 0
+    finished = False
+    last_sent = time.monotonic()
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=config.CHAT_STREAM_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                if time.monotonic() - last_sent >= config.CHAT_STREAM_HEARTBEAT_SECONDS:
+                    last_sent = time.monotonic()
+                    yield event("heartbeat")
+                continue
+
+            if item is None:
+                finished = True
+                stream_stats["completed"] += 1
+                _answers["count"] += 1
+                _answers["tokens"] += tokens
+                if not leader:
+                    answer = "".join(parts)
+                    messages = exchange_messages(state, answer)
+                    await side_effects.submit(
+                        "record_exchange", lambda: record_exchange(state, thread_id, answer, messages)
+                    )
+                yield event("done", thread_id=thread_id, tokens=tokens, cached=False, coalesced=not leader)
+                return
+            if item["event"] == "error":
+                finished = True
+                stream_stats["errors"] += 1
+                yield item
+                return
+            if item["event"] == "token":
+                parts.append(item["data"]["text"])
+                tokens += estimate_tokens(item["data"]["text"])
+                stream_stats["tokens_streamed"] += estimate_tokens(item["data"]["text"])
+            last_sent = time.monotonic()
+            yield item
+    finally:
+        cancelled = answer_flights.leave(flight, queue)
+        if not finished:
+            stream_stats["abandoned"] += 1
+            if cancelled and _answers["count"]:
+                stream_stats["tokens_saved_estimate"] += max(_answers["tokens"] // _answers["count"] - tokens, 0)
+
+
+async def ask_events(request: Request, ask: AskRequest) -> AsyncIterator[dict]:
+    """
+    Answer a question as typed events, starting before any lookup
+
+    accepted goes out first, then either a cached or limit answer as a single
+    token, or the events of a graph run.
+    """
+    yield event("accepted", thread_id=ask.thread_id)
+    try:
+        await record_question(ask)
+        answer: Optional[str] = find_in_exact_cache(ask.question, ask.area_id)
+        question_embedding = None
+        if answer is None:
+            question_embedding = await embeddings.aembed_query(ask.question)
+            answer = await find_in_semantic_cache(ask.question, question_embedding, ask.area_id)
+        if answer is not None:
+            yield event("token", text=answer)
+            yield event("done", thread_id=ask.thread_id, tokens=estimate_tokens(answer), cached=True)
+            return
+        if await has_remaining_quota_for_area(ask.area_id):
+            yield event("token", text=config.LIMIT_REACH_MESSAGE)
+            yield event("done", thread_id=ask.thread_id, tokens=0, cached=False, limit_reached=True)
+            return
+    except Exception as e:
+        print(f"Error answering from the cache: {e}")
+        stream_stats["errors"] += 1
+        yield event("error", message="The answer could not be generated.")
+        return
+
+    state = {
+        "question": ask.question,
+        "context": ask.context,
+        "metadata": ask.metadata,
+        "area_id": ask.area_id,
+        "question_embedding": question_embedding,
+    }
+    async with aclosing(answer_events(request, state, ask.thread_id)) as items:
+        async for item in items:
+            yield item
+
+
+# Both wrappers close the event stream when they are closed, which cancels the graph run
+
+async def sse_stream(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async with aclosing(events):
+        async for item in events:
+            yield f"event: {item['event']}\ndata: {json.dumps(item['data'], ensure_ascii=False)}\n\n"
+
+
+async def text_stream(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    # The plain-text mode only carries the answer
+    async with aclosing(events):
+        async for item in events:
+            if item["event"] == "token":
+                yield item["data"]["text"]
+
+
+def get_stream_stats() -> dict:
+    return {
+        **stream_stats,
+        "average_answer_tokens": _answers["tokens"] // _answers["count"] if _answers["count"] else None,
+        "flights": answer_flights.get_stats(),
+    }
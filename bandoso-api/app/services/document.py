@@ -1,42 +1,134 @@
-from app.db.qdrant import client
-from app.db.qdrant import doc_vector_store
+from app.db.qdrant import get_doc_vector_store
 from app.models.document import *
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from qdrant_client import models
 from app.services.base import query_builder
+from app.services.area import resolve_document_area_id
 from langchain_community.document_loaders import PyPDFLoader
+from app.config import config
+from collections import deque
+from typing import Awaitable, Callable, Optional
+import asyncio
 import uuid
 
-def add_document_from_file(request: AddDocumentFileRequest):
-    loader = PyPDFLoader(request.file_url)
-    pages = []
-    for page in loader.lazy_load():
-        new_metadata = {
-            **request.metadata,
-            **page.metadata
-        }
-        page.metadata = new_metadata
-        pages.append(page)
-
-    doc_ids = doc_vector_store.add_documents(pages)
+def _chunk_id(file_url: str, page_index: int, chunk_index: int) -> str:
+    # Stable ids make re-ingesting the same file (or resuming it) an idempotent upsert
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_url}#page={page_index}&chunk={chunk_index}"))
+
+async def _with_area_id(metadata: dict) -> dict:
+    area_id = await resolve_document_area_id(metadata)
+    return {**metadata, "area_id": area_id} if area_id else metadata
+
+async def ingest_pdf(
+    file_url: str,
+    metadata: dict,
+    start_page: int = 0,
+    on_progress: Optional[Callable[[int, int, list[str]], Awaitable[None]]] = None,
+) -> list[str]:
+    """
+    Stream a PDF into the chunk collection
+
+    Pages are read lazily, split into chunks, and embedded/upserted in batches of
+    INGEST_EMBED_BATCH_SIZE with at most INGEST_CONCURRENCY batches in flight, so
+    memory use does not depend on the size of the file.
+
+    Args:
+        file_url: URL or local path of the PDF
+        metadata: Metadata merged into every chunk
+        start_page: First page to ingest, used to resume an interrupted ingestion
+        on_progress: Awaited as on_progress(pages_done, chunks_done, batch_ids) each time
+            a batch is stored; pages_done counts pages whose chunks are all stored, in order
+
+    Returns:
+        list[str]: The ids of the stored chunks
+    """
+    metadata = await _with_area_id(metadata)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.INGEST_CHUNK_SIZE,
+        chunk_overlap=config.INGEST_CHUNK_OVERLAP,
+    )
+    # PyPDFLoader downloads the file in its constructor and parses on iteration: keep both off the event loop
+    loader = await asyncio.to_thread(PyPDFLoader, file_url)
+    pages = loader.lazy_load()
+
+    doc_ids: list[str] = []
+    in_flight: deque = deque()
+    batch_texts, batch_metadatas, batch_ids = [], [], []
+    chunks_done = 0
+    pages_done = start_page
+
+    async def complete_oldest():
+        nonlocal chunks_done, pages_done
+        task, through_page, size = in_flight.popleft()
+        batch_ids = await task
+        doc_ids.extend(batch_ids)
+        chunks_done += size
+        pages_done = max(pages_done, through_page + 1)
+        if on_progress:
+            await on_progress(pages_done, chunks_done, batch_ids)
+
+    async def flush(through_page: int):
+        nonlocal batch_texts, batch_metadatas, batch_ids
+        in_flight.append((
+            asyncio.create_task(
+                get_doc_vector_store().aadd_texts(batch_texts, batch_metadatas, ids=batch_ids)
+            ),
+            through_page,
+            len(batch_texts),
+        ))
+        batch_texts, batch_metadatas, batch_ids = [], [], []
+        while len(in_flight) >= config.INGEST_CONCURRENCY:
+            await complete_oldest()
+
+    page_index = -1
+    try:
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            page_index += 1
+            if page_index < start_page:
+                continue
+
+            chunks = splitter.split_text(page.page_content)
+            for chunk_index, text in enumerate(chunks):
+                batch_texts.append(text)
+                batch_metadatas.append({**metadata, **page.metadata, "chunk_index": chunk_index})
+                batch_ids.append(_chunk_id(file_url, page_index, chunk_index))
+                if len(batch_texts) >= config.INGEST_EMBED_BATCH_SIZE:
+                    last_of_page = chunk_index == len(chunks) - 1
+                    await flush(page_index if last_of_page else page_index - 1)
+
+        if batch_texts:
+            await flush(page_index)
+        while in_flight:
+            await complete_oldest()
+    except BaseException:
+        for task, _, _ in in_flight:
+            task.cancel()
+        raise
+
+    if on_progress and page_index + 1 > pages_done:
+        await on_progress(page_index + 1, chunks_done, [])
     return doc_ids
 
-def add_document(request: AddDocumentRequest):
+async def add_document_from_file(request: AddDocumentFileRequest):
+    return await ingest_pdf(request.file_url, request.metadata)
+
+async def add_document(request: AddDocumentRequest):
     doc = Document(
         page_content=request.page_content,
-        metadata=request.metadata
+        metadata=await _with_area_id(request.metadata)
     )
-    doc_ids = doc_vector_store.add_documents([doc])
+    doc_ids = await get_doc_vector_store().aadd_documents([doc])
     ids = []
     for doc_id in doc_ids:
         ids.append(str(uuid.UUID(doc_id)))
     return ids
 
-def get_document(request: GetDocumentRequest):
-    records, point_id = doc_vector_store.client.scroll(
+async def get_document(request: GetDocumentRequest):
+    doc_vector_store = get_doc_vector_store()
+    records, point_id = await doc_vector_store.async_client.scroll(
         collection_name=doc_vector_store.collection_name,
-        scroll_filter=query_builder(request.queries),
+        scroll_filter=query_builder(request.queries, doc_vector_store.collection_name),
         limit=request.limit,
         with_vectors=False, 
         with_payload=True,
@@ -51,17 +143,29 @@ def get_document(request: GetDocumentRequest):
         ))
     return GetDocumentResponse(documents=documents)
 
-def delete_document(request: DeleteDocumentRequest):
-    if len(request.ids) == 0:
+async def delete_document(request: DeleteDocumentRequest):
+    if not request.ids and not request.document_ids:
         return True
-    return doc_vector_store.delete(ids=request.ids)
+    doc_vector_store = get_doc_vector_store()
+    result = True
+    if request.ids:
+        result = await doc_vector_store.adelete(ids=request.ids)
+    if request.document_ids:
+        # Files are ingested in the background, so their chunk ids are not known to the caller
+        await doc_vector_store.async_client.delete(
+            collection_name=doc_vector_store.collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must=[
+                models.FieldCondition(key="metadata.document_id", match=models.MatchAny(any=request.document_ids))
+            ])),
+        )
+    return result
 
-def update_document(request: UpdateDocumentRequest):
-    if delete_document(request=DeleteDocumentRequest(id=request.id)):
+async def update_document(request: UpdateDocumentRequest):
+    if await delete_document(request=DeleteDocumentRequest(id=request.id)):
         doc = Document( 
             page_content=request.content,
-            metadata=request.metadata
+            metadata=await _with_area_id(request.metadata)
         )
-        doc_vector_store.add_documents([doc])
+        await get_doc_vector_store().aadd_documents([doc])
     return UpdateDocumentResponse(id=request.id)
 
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.config import config
+from app.core.checkpointer import checkpointer
+from app.core.llm import get_large_llm, get_small_llm
+from app.core.rag import get_graph
+from app.db.indexes import reconcile_payload_indexes
+from app.db.qdrant import ensure_collections, get_async_client, get_cache_vector_store, get_doc_vector_store
+from app.db.supabase import get_async_supabase
+
+_booted_at = time.monotonic()
+# Filled by the app lifespan: how long each startup step took and whether it failed
+startup = {"state": "starting", "boot_seconds": None, "steps": {}}
+_qdrant_ready = False
+_qdrant_lock = asyncio.Lock()
+
+
+async def run_startup_step(name: str, step: Callable[[], Awaitable[None]], required: bool = False) -> bool:
+    """
+    Run and time one startup step
+
+    Args:
+        name: Key of the step in the startup report
+        step: The coroutine function to await
+        required: Re-raise a failure and abort the startup instead of starting degraded
+
+    Returns:
+        bool: True if the step succeeded
+    """
+    started = time.monotonic()
+    error: Optional[str] = None
+    try:
+        await step()
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+        print(f"Startup step {name} failed: {error}")
+        if required:
+            raise
+    finally:
+        startup["steps"][name] = {"seconds": round(time.monotonic() - started, 3), "error": error}
+    return error is None
+
+
+async def init_qdrant() -> None:
+    """Create missing collections and reconcile payload indexes, once."""
+    global _qdrant_ready
+    async with _qdrant_lock:
+        if _qdrant_ready:
+            return
+        await asyncio.to_thread(ensure_collections)
+        try:
+            await reconcile_payload_indexes()
+        except Exception as e:
+            print(f"Error reconciling payload indexes: {e}")
+        _qdrant_ready = True
+
+
+async def warmup() -> None:
+    # Build what the first question would otherwise pay for
+    get_doc_vector_store()
+    get_cache_vector_store()
+    get_large_llm()
+    get_small_llm()
+    get_graph()
+
+
+def mark_started() -> None:
+    startup["state"] = "started"
+    startup["boot_seconds"] = round(time.monotonic() - _booted_at, 3)
+
+
+def mark_stopping() -> None:
+    startup["state"] = "stopping"
+
+
+async def _check_qdrant() -> None:
+    # A Qdrant that was down at startup gets its collections on the first probe after it is back
+    if not _qdrant_ready:
+        await init_qdrant()
+    await get_async_client().get_collections()
+
+
+async def _check_supabase() -> None:
+    supabase = await get_async_supabase()
+    await supabase.table("areas").select("area_id").limit(1).execute()
+
+
+CHECKS = {
+    "qdrant": _check_qdrant,
+    "supabase": _check_supabase,
+    "checkpointer": checkpointer.check,
+}
+
+
+async def _run_check(check: Callable[[], Awaitable[None]]) -> dict:
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(check(), timeout=config.HEALTH_CHECK_TIMEOUT_SECONDS)
+        status, error = "ok", None
+    except asyncio.TimeoutError:
+        status, error = "error", f"timed out after {config.HEALTH_CHECK_TIMEOUT_SECONDS}s"
+    except Exception as e:
+        status, error = "error", f"{e.__class__.__name__}: {e}"
+    return {"status": status, "seconds": round(time.monotonic() - started, 3), "error": error}
+
+
+async def check_readiness() -> tuple[bool, dict]:
+    """
+    Check every dependency a chat request needs, concurrently
+
+    Returns:
+        tuple[bool, dict]: Whether the app can serve traffic, and the report per dependency
+    """
+    results = await asyncio.gather(*(_run_check(check) for check in CHECKS.values()))
+    checks = dict(zip(CHECKS, results))
+    ready = startup["state"] == "started" and all(result["status"] == "ok" for result in checks.values())
+    return ready, {"status": "ready" if ready else "not_ready", "checks": checks, "startup": startup}
+
+
+def check_liveness() -> dict:
+    # No dependency checks: a Qdrant outage must not get every replica restarted
+    return {"status": "alive", "state": startup["state"], "uptime_seconds": round(time.monotonic() - _booted_at, 1)}
@@ -0,0 +1,368 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from app.config import config
+from app.services.document import ingest_pdf
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+# Reported, never stored: a running job whose cancellation is pending
+CANCELLING = "cancelling"
+
+
+class IngestionJobManager:
+    """
+    Runs PDF ingestion in the background on a bounded pool of workers
+
+    Jobs live in a local SQLite table, so their progress survives restarts,
+    and every job resumes from the first page that was not fully stored.
+    Chunk ids are stable, so re-processing a page is an idempotent upsert, and
+    the chunk count is the number of distinct chunk ids stored.
+
+    Several processes can share the table. A job is claimed atomically by one
+    of them, which renews a lease on it every ``heartbeat`` seconds; queued
+    jobs and running jobs whose lease has expired (their process died) are
+    picked up by whichever process claims them first.
+    """
+
+    def __init__(self, db_path: str, workers: int, heartbeat: float, lease: float):
+        self.db_path = db_path
+        self.workers = workers
+        self.heartbeat = heartbeat
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: set[str] = set()
+        self._workers: list[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancel_requested: set[str] = set()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    file_url TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    next_page INTEGER NOT NULL DEFAULT 0,
+                    chunks_processed INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    run_started_at REAL,
+                    run_start_chunks INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS ingestion_job_chunks (
+                    job_id TEXT NOT NULL,
+                    point_id TEXT NOT NULL,
+                    PRIMARY KEY (job_id, point_id)
+                );
+                """
+            )
+            # Columns added after the first release
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(ingestion_jobs)")}
+            for column, definition in (
+                ("owner", "TEXT"),
+                ("heartbeat_at", "REAL"),
+                ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+            ):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} {definition}")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute_sync(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            conn = self._db()
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+
+    async def _execute(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        # Every commit waits for the disk: keep it off the event loop, which also serves the chat streams
+        return await asyncio.to_thread(self._execute_sync, sql, params)
+
+    async def _set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        finished_at = time.time() if status in (SUCCEEDED, FAILED, CANCELLED) else None
+        await self._execute(
+            "UPDATE ingestion_jobs SET status = ?, error = ?, finished_at = ?, owner = NULL, cancel_requested = 0"
+            " WHERE job_id = ?",
+            (status, error, finished_at, job_id),
+        )
+
+    def _claim_sync(self, job_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            claimed = conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, owner = ?, heartbeat_at = ?"
+                " WHERE job_id = ? AND (status = ? OR (status = ? AND COALESCE(heartbeat_at, 0) < ?))",
+                (RUNNING, self.owner, now, job_id, QUEUED, RUNNING, now - self.lease),
+            ).rowcount
+            conn.commit()
+        return bool(claimed)
+
+    async def _claim(self, job_id: str) -> Optional[dict]:
+        """Take a queued job, or a running one whose owner stopped renewing its lease."""
+        if not await asyncio.to_thread(self._claim_sync, job_id):
+            return None
+        return await self.get(job_id)
+
+    def _enqueue(self, job_id: str) -> None:
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _enqueue_claimable(self) -> None:
+        rows = await self._execute(
+            "SELECT job_id FROM ingestion_jobs WHERE status = ? OR (status = ? AND COALESCE(heartbeat_at, 0) < ?)"
+            " ORDER BY created_at",
+            (QUEUED, RUNNING, time.time() - self.lease),
+        )
+        for row in rows:
+            self._enqueue(row["job_id"])
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        # Jobs queued by any process, and jobs whose process died, are picked up again
+        await self._enqueue_claimable()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        tasks = self._workers + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat_task = None
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self._execute(
+                    "UPDATE ingestion_jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                    (time.time(), self.owner, RUNNING),
+                )
+                # Cancellations requested through another process
+                for row in await self._execute(
+                    "SELECT job_id FROM ingestion_jobs WHERE owner = ? AND status = ? AND cancel_requested = 1",
+                    (self.owner, RUNNING),
+                ):
+                    if row["job_id"] in self._running:
+                        self._cancel_requested.add(row["job_id"])
+                        self._running[row["job_id"]].cancel()
+                await self._enqueue_claimable()
+            except Exception as e:
+                print(f"Error renewing ingestion job leases: {e}")
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                job = await self._claim(job_id)
+                if job is None:
+                    continue
+                task = asyncio.create_task(self._run(job))
+                self._running[job_id] = task
+                try:
+                    # wait() does not raise when the job itself is cancelled, only when the worker is
+                    await asyncio.wait({task})
+                except asyncio.CancelledError:
+                    # Worker shutdown: stop the job and leave it queued for the next start
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise
+            finally:
+                self._running.pop(job_id, None)
+                self._queue.task_done()
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["job_id"]
+        now = time.time()
+        await self._execute(
+            "UPDATE ingestion_jobs SET error = NULL, attempts = attempts + 1,"
+            " started_at = COALESCE(started_at, ?), run_started_at = ?, run_start_chunks = chunks_processed"
+            " WHERE job_id = ?",
+            (now, now, job_id),
+        )
+
+        def record_progress(pages_done: int, batch_ids: list[str]) -> None:
+            # A resumed run stores some chunks of its first page again: count distinct ids, not batches
+            with self._lock:
+                conn = self._db()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO ingestion_job_chunks (job_id, point_id) VALUES (?, ?)",
+                    [(job_id, point_id) for point_id in batch_ids],
+                )
+                conn.execute(
+                    "UPDATE ingestion_jobs SET next_page = max(next_page, ?), heartbeat_at = ?,"
+                    " chunks_processed = (SELECT COUNT(*) FROM ingestion_job_chunks WHERE job_id = ?)"
+                    " WHERE job_id = ?",
+                    (pages_done, time.time(), job_id, job_id),
+                )
+                conn.commit()
+
+        async def on_progress(pages_done: int, chunks_done: int, batch_ids: list[str]) -> None:
+            await asyncio.to_thread(record_progress, pages_done, batch_ids)
+
+        try:
+            await ingest_pdf(
+                job["file_url"],
+                job["metadata"],
+                start_page=job["pages_processed"],
+                on_progress=on_progress,
+            )
+            await self._set_status(job_id, SUCCEEDED)
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                self._cancel_requested.discard(job_id)
+                await self._set_status(job_id, CANCELLED)
+            else:
+                await self._set_status(job_id, QUEUED)
+            raise
+        except Exception as e:
+            print(f"Error ingesting {job['file_url']}: {e}")
+            await self._set_status(job_id, FAILED, str(e))
+
+    # Public API
+
+    async def submit(self, file_url: str, metadata: dict) -> str:
+        job_id = str(uuid.uuid4())
+        await self._execute(
+            "INSERT INTO ingestion_jobs (job_id, file_url, metadata, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, file_url, json.dumps(metadata), QUEUED, time.time()),
+        )
+        self._enqueue(job_id)
+        return job_id
+
+    async def get(self, job_id: str, with_ids: bool = False) -> Optional[dict]:
+        rows = await self._execute("SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,))
+        if not rows:
+            return None
+        job = self._to_dict(rows[0])
+        if with_ids:
+            job["ids"] = [
+                row["point_id"]
+                for row in await self._execute("SELECT point_id FROM ingestion_job_chunks WHERE job_id = ?", (job_id,))
+            ]
+        return job
+
+    async def list_jobs(self, limit: int = 50, status: Optional[str] = None) -> list[dict]:
+        if status:
+            rows = await self._execute(
+                "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                (status, limit),
+            )
+        else:
+            rows = await self._execute("SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._to_dict(row) for row in rows]
+
+    async def cancel(self, job_id: str, wait: float = 5.0) -> Optional[dict]:
+        """
+        Cancel a job
+
+        A queued job is cancelled at once. A running one is marked, so it reads
+        as "cancelling" until its run has stopped; a run of this process is
+        stopped here and waited for up to `wait` seconds, a run of another
+        process stops at that process's next heartbeat.
+
+        Args:
+            job_id (str): The job to cancel
+            wait (float): Seconds to wait for a local run to stop
+
+        Returns:
+            Optional[dict]: The job, or None if there is no such job
+        """
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == QUEUED:
+            await self._set_status(job_id, CANCELLED)
+        elif job["status"] == RUNNING:
+            await self._execute("UPDATE ingestion_jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            task = self._running.get(job_id)
+            if task is not None:
+                self._cancel_requested.add(job_id)
+                task.cancel()
+                await asyncio.wait({task}, timeout=wait)
+        return await self.get(job_id)
+
+    async def cancel_documents(self, document_ids: list[str]) -> None:
+        """Cancel the unfinished jobs ingesting files with these metadata document ids."""
+        if not document_ids:
+            return
+        placeholders = ", ".join("?" for _ in document_ids)
+        rows = await self._execute(
+            "SELECT job_id FROM ingestion_jobs WHERE status IN (?, ?)"
+            f" AND json_extract(metadata, '$.document_id') IN ({placeholders})"
+            # Queued ones first, so a worker freed by a cancelled run does not claim them meanwhile
+            " ORDER BY status = ?",
+            (QUEUED, RUNNING, *document_ids, RUNNING),
+        )
+        for row in rows:
+            await self.cancel(row["job_id"])
+
+    async def retry(self, job_id: str) -> Optional[dict]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in (FAILED, CANCELLED):
+            await self._execute(
+                "UPDATE ingestion_jobs SET status = ?, finished_at = NULL WHERE job_id = ?",
+                (QUEUED, job_id),
+            )
+            self._enqueue(job_id)
+        return await self.get(job_id)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["metadata"] = json.loads(job["metadata"])
+        job["pages_processed"] = job.pop("next_page")
+        if job["status"] == RUNNING and job.get("cancel_requested"):
+            job["status"] = CANCELLING
+        for internal in ("owner", "heartbeat_at", "cancel_requested"):
+            job.pop(internal, None)
+        run_started_at = job.pop("run_started_at")
+        run_start_chunks = job.pop("run_start_chunks")
+        end = job["finished_at"] or time.time()
+        if run_started_at and end > run_started_at:
+            job["chunks_per_second"] = (job["chunks_processed"] - run_start_chunks) / (end - run_started_at)
+        else:
+            job["chunks_per_second"] = 0.0
+        return job
+
+
+ingestion_jobs = IngestionJobManager(
+    config.INGEST_JOB_DB_PATH,
+    config.INGEST_WORKERS,
+    heartbeat=config.INGEST_JOB_HEARTBEAT_SECONDS,
+    lease=config.INGEST_JOB_LEASE_SECONDS,
+)
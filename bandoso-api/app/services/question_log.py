@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from app.config import config
+from app.utils.text import normalize_question
+
+
+class QuestionLog:
+    """
+    Counts how often each question is asked, per area
+
+    Conversations are compacted as they grow, so their checkpoints only keep
+    the recent turns; this table keeps one row per (area, normalized question)
+    with its count and first wording, whatever happens to the threads.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "errors": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS asked_questions (
+                    area_id TEXT NOT NULL,
+                    question_key TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    last_asked_at REAL NOT NULL,
+                    PRIMARY KEY (area_id, question_key)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _record(self, question: str, area_id: str) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT INTO asked_questions (area_id, question_key, question, count, last_asked_at)"
+                " VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT (area_id, question_key)"
+                " DO UPDATE SET count = count + 1, last_asked_at = excluded.last_asked_at",
+                (area_id, normalize_question(question), question.strip(), time.time()),
+            )
+            conn.commit()
+
+    async def record(self, question: str, area_id: Optional[str] = None) -> None:
+        """Count one ask of a question."""
+        if not question.strip():
+            return
+        try:
+            await asyncio.to_thread(self._record, question, area_id or "")
+            self.stats["recorded"] += 1
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+    def _counts(self, area_id: Optional[str]) -> list[tuple]:
+        with self._lock:
+            conn = self._db()
+            if area_id:
+                return conn.execute(
+                    "SELECT area_id, question_key, question, count FROM asked_questions WHERE area_id = ?",
+                    (area_id,),
+                ).fetchall()
+            return conn.execute("SELECT area_id, question_key, question, count FROM asked_questions").fetchall()
+
+    async def counts(self, area_id: Optional[str] = None) -> tuple[Counter, dict]:
+        """
+        How often each question was asked
+
+        Args:
+            area_id: Only this area's questions
+
+        Returns:
+            tuple[Counter, dict]: Counts keyed by (area_id, normalized question), and
+                the first wording seen for each key
+        """
+        counts: Counter = Counter()
+        texts: dict = {}
+        for row_area_id, key, question, count in await asyncio.to_thread(self._counts, area_id):
+            counts[(row_area_id or None, key)] = count
+            texts[(row_area_id or None, key)] = question
+        return counts, texts
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+question_log = QuestionLog(config.QUESTION_LOG_DB_PATH)
@@ -0,0 +1,235 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import config
+from app.db.supabase import get_async_supabase
+from app.utils.cache import TTLCache
+
+
+class RequestCountAggregator:
+    """
+    Buffers chatbot request increments and flushes them as atomic increments
+
+    Every increment is journaled to a local SQLite file before it is counted,
+    so a crash cannot lose it. A flush moves the pending deltas into an outbox
+    under a fresh flush id and applies each outbox row with the
+    ``increment_chatbot_request_count`` RPC, which records the flush id in the
+    same transaction. Replaying an outbox row after a crash is therefore a
+    no-op on the database instead of a double count.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float, flush_id_retention: float):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.flush_id_retention = flush_id_retention
+        self._last_prune_at = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Increments not yet confirmed by the database, per (area_id, period_start)
+        self._unflushed: dict[tuple[str, str], int] = {}
+        self._oldest_pending_at: Optional[float] = None
+        # Last count the database reported, per (area_id, period_start)
+        self._known = TTLCache(maxsize=config.AREA_CACHE_MAX_SIZE, ttl=config.AREA_COUNT_TTL_SECONDS)
+        self.stats = {
+            "increments": 0,
+            "flushes": 0,
+            "rows_applied": 0,
+            "failures": 0,
+            "flush_ids_pruned": 0,
+            "last_flush_at": None,
+            "last_flush_seconds": None,
+        }
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pending (
+                    area_id TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    delta INTEGER NOT NULL,
+                    first_at REAL NOT NULL,
+                    PRIMARY KEY (area_id, period_start)
+                );
+                CREATE TABLE IF NOT EXISTS outbox (
+                    flush_id TEXT PRIMARY KEY,
+                    area_id TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    delta INTEGER NOT NULL,
+                    first_at REAL NOT NULL
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load_unflushed(self) -> None:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT area_id, period_start, SUM(delta), MIN(first_at) FROM ("
+                " SELECT area_id, period_start, delta, first_at FROM pending"
+                " UNION ALL SELECT area_id, period_start, delta, first_at FROM outbox"
+                ") GROUP BY area_id, period_start"
+            ).fetchall()
+            # Assigned under the lock so an increment journaled concurrently is not counted twice
+            self._unflushed = {(area_id, period_start): delta for area_id, period_start, delta, _ in rows}
+            self._oldest_pending_at = min((row[3] for row in rows), default=None)
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._load_unflushed()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing request counts: {e}")
+
+    # Counting
+
+    def _journal(self, area_id: str, period_start: str, delta: int) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT INTO pending (area_id, period_start, delta, first_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (area_id, period_start) DO UPDATE SET delta = delta + excluded.delta",
+                (area_id, period_start, delta, now),
+            )
+            conn.commit()
+            key = (area_id, period_start)
+            self._unflushed[key] = self._unflushed.get(key, 0) + delta
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = now
+
+    async def increment(self, area_id: str, period_start: str, delta: int = 1) -> None:
+        # The commit waits for an fsync: keep it off the event loop
+        await asyncio.to_thread(self._journal, area_id, period_start, delta)
+        self.stats["increments"] += delta
+
+    def unflushed(self, area_id: str, period_start: str) -> int:
+        return self._unflushed.get((area_id, period_start), 0)
+
+    def known_count(self, area_id: str, period_start: str) -> Optional[int]:
+        return self._known.get((area_id, period_start))
+
+    def set_known_count(self, area_id: str, period_start: str, count: int) -> None:
+        self._known.set((area_id, period_start), count)
+
+    def _move_to_outbox(self) -> list[tuple]:
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT INTO outbox (flush_id, area_id, period_start, delta, first_at)"
+                " SELECT lower(hex(randomblob(16))), area_id, period_start, delta, first_at FROM pending"
+            )
+            conn.execute("DELETE FROM pending")
+            conn.commit()
+            return conn.execute(
+                "SELECT flush_id, area_id, period_start, delta FROM outbox ORDER BY first_at"
+            ).fetchall()
+
+    def _confirm(self, flush_id: str, key: tuple[str, str], delta: int) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM outbox WHERE flush_id = ?", (flush_id,))
+            conn.commit()
+            self._unflushed[key] = self._unflushed.get(key, 0) - delta
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            started = time.monotonic()
+            rows = await asyncio.to_thread(self._move_to_outbox)
+            if not rows:
+                return
+
+            supabase = await get_async_supabase()
+            for flush_id, area_id, period_start, delta in rows:
+                try:
+                    response = await supabase.rpc("increment_chatbot_request_count", {
+                        "p_flush_id": str(uuid.UUID(flush_id)),
+                        "p_area_id": area_id,
+                        "p_period_start": period_start,
+                        "p_delta": delta,
+                    }).execute()
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    print(f"Error applying request count flush {flush_id}: {e}")
+                    continue
+
+                key = (area_id, period_start)
+                await asyncio.to_thread(self._confirm, flush_id, key, delta)
+                # The RPC returns the new total, which keeps quota checks off the database
+                if isinstance(response.data, int):
+                    self._known.set(key, response.data)
+                else:
+                    self._known.pop(key)
+                self.stats["rows_applied"] += 1
+
+            await asyncio.to_thread(self._load_unflushed)
+            self.stats["flushes"] += 1
+            self.stats["last_flush_at"] = time.time()
+            self.stats["last_flush_seconds"] = time.monotonic() - started
+
+            if time.time() - self._last_prune_at >= min(self.flush_id_retention, 3600):
+                await self._prune_flush_ids(supabase)
+
+    async def _prune_flush_ids(self, supabase) -> None:
+        """
+        Forget applied flush ids that can no longer be retried
+
+        A flush id is only retried while its outbox row is here, so ids older
+        than both the retention and the oldest unconfirmed increment are safe
+        to drop.
+        """
+        cutoff = time.time() - self.flush_id_retention
+        if self._oldest_pending_at is not None:
+            cutoff = min(cutoff, self._oldest_pending_at)
+        try:
+            response = await supabase.rpc("prune_chatbot_request_count_flushes", {
+                "p_applied_before": datetime.fromtimestamp(cutoff, timezone.utc).isoformat(),
+            }).execute()
+        except Exception as e:
+            print(f"Error pruning request count flush ids: {e}")
+            return
+        self._last_prune_at = time.time()
+        if isinstance(response.data, int):
+            self.stats["flush_ids_pruned"] += response.data
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "unflushed_keys": len(self._unflushed),
+            "unflushed_increments": sum(self._unflushed.values()),
+            # How long the oldest increment has been waiting for the database
+            "flush_lag_seconds": time.time() - self._oldest_pending_at if self._oldest_pending_at else 0.0,
+        }
+
+
+request_counts = RequestCountAggregator(
+    config.REQUEST_COUNT_DB_PATH,
+    config.REQUEST_COUNT_FLUSH_INTERVAL_SECONDS,
+    config.REQUEST_COUNT_FLUSH_ID_RETENTION_SECONDS,
+)
@@ -0,0 +1,129 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.config import config
+
+
+class SideEffectExecutor:
+    """
+    Runs follow-up work after a response, off the request's critical path
+
+    Graph nodes submit side effects (cache insert, quota increment) instead
+    of awaiting them, so the answer stream closes as soon as the model is
+    done. A bounded queue feeds a few workers that retry failures with
+    exponential backoff. When the queue is full, or the executor is not
+    running (CLI tools), the submitter runs the work itself: slower, but
+    nothing is dropped. Stopping drains the queue for up to ``drain_timeout``.
+    """
+
+    def __init__(self, queue_size: int, workers: int, max_attempts: int, backoff: float, drain_timeout: float):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+        self._in_flight = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "retries": 0,
+            "failed": 0,
+            "inline": 0,
+            "lost": 0,
+            "failures_by_name": {},
+        }
+
+    # Lifecycle
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(max(self.workers, 1))]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Side effects unfinished after {self.drain_timeout}s: dropping "
+                  f"{self._queue.qsize()} queued and {self._in_flight} running")
+            self.stats["lost"] += self._in_flight
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.stats["lost"] += 1
+
+    async def _work(self) -> None:
+        while True:
+            name, run = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._run(name, run)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    async def _run(self, name: str, run: Callable[[], Awaitable]) -> None:
+        for attempt in range(self.max_attempts):
+            try:
+                await run()
+                self.stats["completed"] += 1
+                return
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts:
+                    print(f"Side effect {name} failed after {self.max_attempts} attempts: {e}")
+                    self.stats["failed"] += 1
+                    failures = self.stats["failures_by_name"]
+                    failures[name] = failures.get(name, 0) + 1
+                    return
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    # Public API
+
+    async def submit(self, name: str, run: Callable[[], Awaitable]) -> None:
+        """
+        Queue a side effect
+
+        Args:
+            name: Label for the failure metrics
+            run: Called with no arguments for each attempt; must be safe to retry
+        """
+        self.stats["submitted"] += 1
+        if self.running:
+            try:
+                self._queue.put_nowait((name, run))
+                return
+            except asyncio.QueueFull:
+                pass
+        self.stats["inline"] += 1
+        await self._run(name, run)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait until everything submitted so far has run."""
+        await asyncio.wait_for(self._queue.join(), timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "failures_by_name": dict(self.stats["failures_by_name"]),
+            "queued": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "in_flight": self._in_flight,
+            "workers": len(self._workers),
+        }
+
+
+side_effects = SideEffectExecutor(
+    queue_size=config.SIDE_EFFECT_QUEUE_SIZE,
+    workers=config.SIDE_EFFECT_WORKERS,
+    max_attempts=config.SIDE_EFFECT_MAX_ATTEMPTS,
+    backoff=config.SIDE_EFFECT_RETRY_BACKOFF_SECONDS,
+    drain_timeout=config.SIDE_EFFECT_DRAIN_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,94 @@
+import asyncio
+from typing import AsyncIterator, Callable, Hashable, Optional
+
+
+class Flight:
+    """One shared run: its events so far and the queues of its subscribers."""
+
+    def __init__(self, key: Optional[Hashable]):
+        self.key = key
+        self.events: list = []
+        self.subscribers: list[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+        self.finished = False
+
+
+class SingleFlight:
+    """
+    Shares one run of a producer between concurrent identical requests
+
+    The first request for a key starts the producer in a task; requests for
+    the same key arriving while it runs subscribe to it instead of starting
+    their own. Every event is kept, so a late subscriber first receives what
+    it missed, then the live events. The run is cancelled only when its last
+    subscriber leaves, and the key is released as soon as it finishes.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, Flight] = {}
+        self.stats = {"runs": 0, "joined": 0, "cancelled": 0}
+
+    def join(self, key: Optional[Hashable], produce: Callable[[], AsyncIterator]) -> tuple[Flight, asyncio.Queue, bool]:
+        """
+        Subscribe to the run for a key, starting it if there is none
+
+        Args:
+            key: What makes two requests identical; None never shares the run
+            produce: Called once per run, returns the event iterator
+
+        Returns:
+            tuple[Flight, asyncio.Queue, bool]: The run, the subscriber's queue
+                (None marks the end) and whether this request started the run
+        """
+        flight = self._flights.get(key) if key is not None else None
+        leader = flight is None
+        if leader:
+            flight = Flight(key)
+            if key is not None:
+                self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(flight, produce))
+            self.stats["runs"] += 1
+        else:
+            self.stats["joined"] += 1
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in flight.events:
+            queue.put_nowait(item)
+        flight.subscribers.append(queue)
+        return flight, queue, leader
+
+    def leave(self, flight: Flight, queue: asyncio.Queue) -> bool:
+        """Unsubscribe; returns True when this cancelled the run."""
+        if queue in flight.subscribers:
+            flight.subscribers.remove(queue)
+        if flight.subscribers or flight.finished:
+            return False
+        self._release(flight)
+        flight.task.cancel()
+        self.stats["cancelled"] += 1
+        return True
+
+    async def _run(self, flight: Flight, produce: Callable[[], AsyncIterator]) -> None:
+        try:
+            async for item in produce():
+                flight.events.append(item)
+                for queue in flight.subscribers:
+                    queue.put_nowait(item)
+        finally:
+            flight.finished = True
+            self._release(flight)
+            for queue in flight.subscribers:
+                queue.put_nowait(None)
+
+    def _release(self, flight: Flight) -> None:
+        if flight.key is not None and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "in_flight": len(self._flights),
+            "subscribers": sum(len(flight.subscribers) for flight in self._flights.values()),
+        }
+
+
+answer_flights = SingleFlight()
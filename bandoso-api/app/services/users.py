@@ -1,7 +1,8 @@
 
 from pydantic import EmailStr
-from app.db.supabase import supabase
+from app.db.supabase import get_supabase
 from app.models.users import *
+from app.dependencies.auth import invalidate_user_role
 
 def update_account_profile(account_id: str, email:EmailStr, role: str = "admin") -> bool:
     """
@@ -15,10 +16,11 @@ def update_account_profile(account_id: str, email:EmailStr, role: str = "admin")
         bool: True if update was successful, False otherwise
     """
     try:
-        response = supabase.table("account_profiles").update({
+        response = get_supabase().table("account_profiles").update({
             "role": role,
             "email": email
         }).eq("account_id", account_id).execute()
+        invalidate_user_role(account_id)
 
         if len(response.data) > 0:
             return True
@@ -41,7 +43,7 @@ def update_user_account(request: UserUpdateRequest) -> bool:
     """
     try:
         print(request.dict())
-        response = supabase.auth.admin.update_user_by_id(
+        response = get_supabase().auth.admin.update_user_by_id(
             request.user_id,
             {
                 "email": request.email,
@@ -68,7 +70,8 @@ def delete_user_account(user_id: str) -> bool:
         bool: True if deletion was successful, False otherwise
     """
     try:
-        response = supabase.auth.admin.delete_user(user_id)
+        response = get_supabase().auth.admin.delete_user(user_id)
+        invalidate_user_role(user_id)
         return True
     except Exception as e:
         # Log error in production
@@ -77,7 +80,7 @@ def delete_user_account(user_id: str) -> bool:
 
 def create_user(user: UserCreateRequest) -> str:
     try: 
-        response = supabase.auth.admin.create_user(
+        response = get_supabase().auth.admin.create_user(
             {
                 "email": user.email,
                 "password": user.password,
@@ -105,7 +108,7 @@ def create_account_profile(account_id: str, email:EmailStr, role: str = "admin")
         bool: True if creation was successful, False otherwise
     """
     try:
-        response = supabase.table("account_profiles").insert({
+        response = get_supabase().table("account_profiles").insert({
             "account_id": account_id,
             "role": role,
             "email": email
@@ -1,19 +1,150 @@
+import asyncio
+import time
+from typing import Optional
+
+from postgrest.types import ReturnMethod
+
 from app.models.visitor_logs import AddVisitorLogRequest, AddVisitorLogResponse
-from app.db.supabase import supabase
-def add_visitor_log(request: AddVisitorLogRequest) -> AddVisitorLogResponse:
-    entry = supabase.table("visitor_logs").select("*").eq("session_id", request.session_id).execute()
-    if (entry.data):
-        return AddVisitorLogResponse(status=False)
+from app.db.supabase import get_async_supabase
+from app.utils.cache import TTLCache
+from app.config import config
+
+
+class VisitorLogWriter:
+    """
+    Write-behind pipeline for visitor logs
+
+    Requests only check an in-memory set of recently seen session ids and
+    enqueue the row. A background task drains the queue and writes batches
+    with a single upsert that ignores rows whose session_id already exists,
+    so the unique index on ``visitor_logs.session_id`` is the real dedupe and
+    the in-memory set only saves work. When the queue is full, new logs are
+    dropped rather than slowing the endpoint down.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float,
+                 dedupe_size: int, dedupe_ttl: float, max_attempts: int = 3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._seen = TTLCache(maxsize=dedupe_size, ttl=dedupe_ttl)
+        self._task: Optional[asyncio.Task] = None
+        # Rows taken off the queue by the background task and not yet written
+        self._batch: list[dict] = []
+        self.stats = {
+            "accepted": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "written": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "lost": 0,
+            "last_flush_at": None,
+        }
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Rewriting a batch the task was cancelled in the middle of is harmless: the upsert ignores duplicates
+        batch, self._batch = self._batch, []
+        await self._write(batch)
+        # Drain whatever is still buffered
+        while not self._queue.empty():
+            await self._write(self._take(self.batch_size))
 
-    response = (
-            supabase.table("visitor_logs")
-            .insert({
+    async def _run(self) -> None:
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(self._batch)
+            self._batch = []
+
+    def _take(self, limit: int) -> list[dict]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        # Postgres rejects an upsert that touches the same key twice
+        rows = list({row["session_id"]: row for row in batch}.values())
+        for attempt in range(self.max_attempts):
+            try:
+                supabase = await get_async_supabase()
+                await (
+                    supabase.table("visitor_logs")
+                    .upsert(rows, on_conflict="session_id", ignore_duplicates=True, returning=ReturnMethod.minimal)
+                    .execute()
+                )
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+                self.stats["last_flush_at"] = time.time()
+                return
+            except Exception as e:
+                print(f"Error writing {len(rows)} visitor logs (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self.max_attempts:
+                    await asyncio.sleep(2 ** attempt)
+        self.stats["failed_batches"] += 1
+        self.stats["lost"] += len(rows)
+        # Let these sessions be logged again if they come back
+        for row in rows:
+            self._seen.pop(row["session_id"])
+
+    # Public API
+
+    def add(self, request: AddVisitorLogRequest) -> bool:
+        if request.session_id in self._seen:
+            self.stats["duplicates"] += 1
+            return False
+        try:
+            self._queue.put_nowait({
                 "area_id": request.area_id,
                 "metadata": request.metadata,
-                "session_id": request.session_id
+                "session_id": request.session_id,
             })
-            .execute()
-        )
-    if (response.data):
-        return AddVisitorLogResponse(status=response)
-    return AddVisitorLogResponse(status=False)
\ No newline at end of file
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self._seen.set(request.session_id, True)
+        self.stats["accepted"] += 1
+        return True
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() + len(self._batch),
+            "queue_capacity": self._queue.maxsize,
+            "seen_sessions": len(self._seen),
+        }
+
+
+visitor_log_writer = VisitorLogWriter(
+    queue_size=config.VISITOR_LOG_QUEUE_SIZE,
+    batch_size=config.VISITOR_LOG_BATCH_SIZE,
+    flush_interval=config.VISITOR_LOG_FLUSH_INTERVAL_SECONDS,
+    dedupe_size=config.VISITOR_LOG_DEDUPE_MAX_SIZE,
+    dedupe_ttl=config.VISITOR_LOG_DEDUPE_TTL_SECONDS,
+)
+
+
+def add_visitor_log(request: AddVisitorLogRequest) -> AddVisitorLogResponse:
+    # Queued for the background writer; status is False for a known session or a full queue
+    return AddVisitorLogResponse(status=visitor_log_writer.add(request))
@@ -0,0 +1,46 @@
+import hashlib
+import re
+import unicodedata
+
+# Vietnamese tone marks once the text is decomposed (NFD)
+_TONE_MARKS = "\u0300\u0301\u0303\u0309\u0323"
+# "hòa"/"hoà", "khỏe"/"khoẻ", "thủy"/"thuỷ": old and new tone placement in open syllables
+_OLD_STYLE_TONE = re.compile(
+    f"(?:(o)([{_TONE_MARKS}])([ae])|(u)([{_TONE_MARKS}])(y))(?![a-z\u0300-\u036f])"
+)
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n?!.,;:…\"'“”‘’()-"
+
+
+def _move_tone_mark(match: re.Match) -> str:
+    first, tone, second = (group for group in match.groups() if group)
+    return first + second + tone
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for exact-match lookups
+
+    Composed and decomposed Vietnamese input, old and new tone placement,
+    case, surrounding punctuation and repeated whitespace all map to the same
+    string. Diacritics are kept because they change the meaning of a word.
+
+    Args:
+        text: The raw question
+
+    Returns:
+        str: The normalized question
+    """
+    text = unicodedata.normalize("NFD", text.casefold())
+    text = _OLD_STYLE_TONE.sub(_move_tone_mark, text)
+    text = unicodedata.normalize("NFC", text)
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+def question_key(question: str, area_id: str | None = None) -> tuple[str, str]:
+    """
+    Build the (area_id, sha256 of normalized question) key used by in-process caches
+    """
+    digest = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+    return area_id or "", digest
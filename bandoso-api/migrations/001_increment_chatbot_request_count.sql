@@ -0,0 +1,44 @@
+-- Atomic, idempotent increments for chatbot_request_counts.
+-- Used by app/services/request_counts.py: each buffered flush carries a flush id,
+-- and a flush id that was already applied is ignored, so replaying after a crash
+-- cannot double count.
+
+create unique index if not exists chatbot_request_counts_area_period_key
+    on public.chatbot_request_counts (area_id, period_start);
+
+create table if not exists public.chatbot_request_count_flushes (
+    flush_id uuid primary key,
+    applied_at timestamptz not null default now()
+);
+
+create or replace function public.increment_chatbot_request_count(
+    p_flush_id uuid,
+    p_area_id bigint,
+    p_period_start timestamptz,
+    p_delta integer
+) returns integer
+language plpgsql
+as $$
+declare
+    new_count integer;
+begin
+    insert into public.chatbot_request_count_flushes (flush_id)
+    values (p_flush_id)
+    on conflict (flush_id) do nothing;
+
+    if not found then
+        select request_count into new_count
+        from public.chatbot_request_counts
+        where area_id = p_area_id and period_start = p_period_start;
+        return new_count;
+    end if;
+
+    insert into public.chatbot_request_counts (area_id, period_start, request_count)
+    values (p_area_id, p_period_start, p_delta)
+    on conflict (area_id, period_start)
+    do update set request_count = public.chatbot_request_counts.request_count + excluded.request_count
+    returning request_count into new_count;
+
+    return new_count;
+end;
+$$;
@@ -0,0 +1,11 @@
+-- Visitor logs are written in batches with
+-- upsert(on_conflict="session_id", ignore_duplicates=True), which needs a
+-- unique index on session_id. Keep the first row of any duplicated session
+-- before creating it.
+delete from public.visitor_logs a
+using public.visitor_logs b
+where a.session_id = b.session_id
+  and a.ctid > b.ctid;
+
+create unique index if not exists visitor_logs_session_id_key
+    on public.visitor_logs (session_id);
@@ -0,0 +1,21 @@
+-- Applied flush ids only need to be kept while a flush can still be retried.
+-- app/services/request_counts.py calls this periodically with a cutoff older
+-- than its retention and than its oldest unconfirmed increment.
+
+create index if not exists chatbot_request_count_flushes_applied_at_idx
+    on public.chatbot_request_count_flushes (applied_at);
+
+create or replace function public.prune_chatbot_request_count_flushes(
+    p_applied_before timestamptz
+) returns integer
+language plpgsql
+as $$
+declare
+    deleted integer;
+begin
+    delete from public.chatbot_request_count_flushes
+    where applied_at < p_applied_before;
+    get diagnostics deleted = row_count;
+    return deleted;
+end;
+$$;
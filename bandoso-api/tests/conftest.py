@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The settings are read at import time; the tests never reach these services
+os.environ.setdefault("SUPABASE_HOST", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test")
+os.environ.setdefault("JINA_AI_API_KEY", "test")
+os.environ.setdefault("GOOGLE_AI_API_KEY", "test")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
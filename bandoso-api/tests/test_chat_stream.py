@@ -0,0 +1,54 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.config import config
+from app.core import rag, routing, tools
+from app.core.checkpointer import checkpointer
+from app.services import chat_stream
+
+
+class Connected:
+    async def is_disconnected(self):
+        return False
+
+
+def test_small_llm_router_output_is_not_streamed(monkeypatch):
+    # Two questions: one streamed as events, one as plain text
+    router = GenericFakeChatModel(messages=iter([AIMessage(content="RETRIEVE")] * 2))
+    answer = GenericFakeChatModel(messages=iter([AIMessage(content="Đền Hùng ở Phú Thọ.")] * 2))
+
+    async def search_documents(*args, **kwargs):
+        return "Đền Hùng nằm trên núi Nghĩa Lĩnh, Phú Thọ."
+
+    async def noop(*args, **kwargs):
+        return True
+
+    monkeypatch.setattr(config, "ROUTER_MODE", "small_llm")
+    monkeypatch.setattr(config, "CHAT_STREAM_COALESCE", False)
+    monkeypatch.setattr(routing, "get_small_llm", lambda: router)
+    monkeypatch.setattr(rag, "get_large_llm", lambda: answer)
+    monkeypatch.setattr(rag, "add_to_cache", noop)
+    monkeypatch.setattr(rag, "increment_area_request_count", noop)
+    monkeypatch.setattr(tools, "search_documents", search_documents)
+
+    async def run():
+        await checkpointer.start()
+        try:
+            state = {"question": "Đền Hùng ở đâu?", "context": "", "metadata": {}, "area_id": None}
+            events = [item async for item in chat_stream.answer_events(Connected(), state, "router-test")]
+            text = "".join([part async for part in chat_stream.text_stream(
+                chat_stream.answer_events(Connected(), {**state, "question": "Đền Hùng ở tỉnh nào?"}, "router-test-2")
+            )])
+        finally:
+            await checkpointer.stop()
+        return events, text
+
+    events, text = asyncio.run(run())
+
+    tokens = "".join(item["data"]["text"] for item in events if item["event"] == "token")
+    assert "RETRIEVE" not in tokens
+    assert tokens == "Đền Hùng ở Phú Thọ."
+    assert events[-1]["event"] == "done"
+    assert text == "Đền Hùng ở Phú Thọ."
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+from app.core import routing
+
+
+@pytest.mark.parametrize("question", [
+    "Tôi chưa hiểu",
+    "Thời tiết hôm nay thế nào?",
+    "2+2 bằng mấy?",
+    "Xin chào, bạn là ai?",
+    "Cảm ơn!",
+    "Bạn định làm gì?",
+    "Khi nào bạn đến?",
+])
+def test_heuristic_router_leaves_other_questions_to_the_model(monkeypatch, question):
+    monkeypatch.setattr(config, "ROUTER_MODE", "heuristic")
+    monkeypatch.setattr(config, "ROUTER_CONFIDENCE_THRESHOLD", 0.7)
+    assert asyncio.run(routing.route_question(question)) == routing.LLM
+
+
+@pytest.mark.parametrize("question", [
+    "Đền Hùng ở đâu?",
+    "Chùa Một Cột được xây dựng năm nào?",
+    "Giới thiệu về lịch sử của địa điểm này",
+    "Dia dao Cu Chi nam o dau?",
+    "Xin chào, bảo tàng mở cửa lúc mấy giờ?",
+])
+def test_heuristic_router_sends_site_questions_to_retrieval(monkeypatch, question):
+    monkeypatch.setattr(config, "ROUTER_MODE", "heuristic")
+    monkeypatch.setattr(config, "ROUTER_CONFIDENCE_THRESHOLD", 0.7)
+    assert asyncio.run(routing.route_question(question)) == routing.RETRIEVE